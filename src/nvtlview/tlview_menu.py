@@ -65,6 +65,17 @@ class TlviewMenu(tk.Menu):
             label=_('Standard'),
             command=self._event('<<reset_casc>>'),
         )
+        self.cascadeMenu.add_separator()
+
+        # Packed cascading checkbutton.
+        self._packedCascadingVar = tk.BooleanVar(
+            value=prefs['packed_cascading'],
+        )
+        self.cascadeMenu.add_checkbutton(
+            label=_('Packed'),
+            variable=self._packedCascadingVar,
+            command=self._change_cascading_mode,
+        )
 
         # "Options" menu.
         self.optionsMenu = tk.Menu(self, tearoff=0)
@@ -90,6 +101,16 @@ class TlviewMenu(tk.Menu):
             command=self._change_color_mode,
         )
 
+        # Draw timing checkbutton.
+        self._drawTimingVar = tk.BooleanVar(
+            value=prefs['draw_timing_overlay'],
+        )
+        self.optionsMenu.add_checkbutton(
+            label=_('Show draw timing'),
+            variable=self._drawTimingVar,
+            command=self._change_draw_timing,
+        )
+
         # "Help" menu.
         self.helpMenu = tk.Menu(self, tearoff=0)
         self.add_cascade(label=_('Help'), menu=self.helpMenu)
@@ -106,6 +127,11 @@ class TlviewMenu(tk.Menu):
 
         return callback
 
+    def _change_cascading_mode(self):
+        prefs['packed_cascading'] = self._packedCascadingVar.get()
+        root = self.master.winfo_toplevel()
+        root.event_generate('<<refresh_view>>')
+
     def _change_color_mode(self):
         prefs['dark_mode'] = self._darkModeVar.get()
         if prefs['dark_mode']:
@@ -132,6 +158,12 @@ class TlviewMenu(tk.Menu):
         root = self.master.winfo_toplevel()
         root.event_generate('<<refresh_view>>')
 
+    def _change_draw_timing(self):
+        prefs['draw_timing_overlay'] = self._drawTimingVar.get()
+        prefs['draw_timing'] = prefs['draw_timing_overlay']
+        root = self.master.winfo_toplevel()
+        root.event_generate('<<refresh_view>>')
+
     def _change_substitution_mode(self):
         prefs['substitute_missing_time'] = (
             self._substituteMissingTimeVar.get()
@@ -35,6 +35,10 @@ class TlviewService(SubController):
     OPTIONS = dict(
         substitute_missing_time=False,
         dark_mode=True,
+        packed_cascading=False,
+        draw_timing=False,
+        draw_timing_overlay=False,
+        latency_tracing=False,
     )
 
     def __init__(self, model, view, controller):
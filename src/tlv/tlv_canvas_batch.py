@@ -0,0 +1,94 @@
+"""Provide a class for batched canvas commands.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+
+
+class TlvCanvasBatch:
+    """Collect canvas commands and submit them in a single Tcl call.
+
+    Each canvas method call is a round trip from Python to Tcl.
+    When drawing many items, the batch saves the round trips
+    by passing all commands as a nested list to a Tcl procedure
+    that executes them.
+
+    Item creation is deferred until submit().
+    The caller provides a list and an index, where the new item's ID
+    is stored on submit.
+    """
+
+    TCL_PROC = 'tlv_canvas_batch'
+    TCL_SCRIPT = (
+        f'proc {TCL_PROC} {{canvas commands}} {{\n'
+        '    set ids {}\n'
+        '    foreach command $commands {\n'
+        '        set result [$canvas {*}$command]\n'
+        '        if {[lindex $command 0] eq "create"} {\n'
+        '            lappend ids $result\n'
+        '        }\n'
+        '    }\n'
+        '    return $ids\n'
+        '}'
+    )
+    # the procedure returns the IDs of the created items
+
+    def __init__(self, canvas):
+        self._canvas = canvas
+        self._commands = []
+        self._targets = []
+        # (list, index) tuples for storing the IDs of the created items
+        canvas.tk.eval(self.TCL_SCRIPT)
+
+    def coords(self, item, *coords):
+        """Queue setting the coordinates of an item."""
+        self._commands.append(('coords', item, *coords))
+
+    def create(self, items, index, itemType, *coords, **options):
+        """Queue the creation of an item.
+
+        Positional arguments:
+            items: list -- The new item's ID is stored here on submit.
+            index: int -- Position of the new item's ID in items.
+            itemType: str -- Canvas item type, e.g. 'line' or 'text'.
+            coords -- Item coordinates.
+
+        The options are the same as for the canvas create methods.
+        """
+        command = ['create', itemType, *coords]
+        self._add_options(command, options)
+        self._commands.append(command)
+        self._targets.append((items, index))
+
+    def itemconfigure(self, item, **options):
+        """Queue setting the options of an item."""
+        command = ['itemconfigure', item]
+        self._add_options(command, options)
+        self._commands.append(command)
+
+    def submit(self):
+        """Execute the queued commands, and store the new item IDs."""
+        if not self._commands:
+            return
+
+        commands = tuple(self._commands)
+        targets = self._targets
+        self._commands = []
+        self._targets = []
+        result = self._canvas.tk.call(self.TCL_PROC, self._canvas._w, commands)
+        for (items, index), itemId in zip(
+            targets,
+            self._canvas.tk.splitlist(result),
+        ):
+            items[index] = int(itemId)
+
+    def _add_options(self, command, options):
+        """Append the options to a command as Tcl arguments.
+
+        Options set to None are omitted, as with the canvas methods.
+        """
+        for key, value in options.items():
+            if value is not None:
+                command.append(f'-{key}')
+                command.append(value)
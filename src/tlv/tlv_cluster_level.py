@@ -0,0 +1,149 @@
+"""Provide a class for a level of detail of the section index.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+
+from tlv.tlv_helper import get_duration
+from tlv.tlv_helper import get_duration_str
+from tlv.tlv_locale import _
+
+
+class TlvClusterLevel:
+    """Sorted sections, with close consecutive sections merged into clusters.
+
+    Consecutive sections are merged, if their start timestamps
+    are less than maxGap seconds apart.
+    A level is built either from the section index,
+    or from the level below by merging its clusters.
+
+    Public instance variables:
+        maxGap: int -- Maximum gap in seconds between clustered sections.
+        starts: array of the entry timestamps, sorted.
+        durations: array of the entry durations in seconds.
+        maxDuration: int -- Duration of the longest entry in seconds.
+        clusterRanges: dict -- key: cluster ID, value: (start, end).
+    """
+    CLUSTER_PREFIX = 'cl_'
+
+    def __init__(self, sectionIndex, maxGap, lowerLevel=None):
+        """Merge the sections or the clusters of the lower level.
+
+        Positional arguments:
+            sectionIndex: TlvSectionIndex -- The sorted sections.
+            maxGap: int -- Maximum gap in seconds between clustered sections.
+
+        Optional arguments:
+            lowerLevel: TlvClusterLevel -- Level with a smaller maxGap.
+        """
+        self.maxGap = maxGap
+        self.starts = array('q')
+        self.durations = array('q')
+        self.maxDuration = 0
+        self.clusterRanges = {}
+
+        self._sectionIndex = sectionIndex
+        self._entries = []
+        # row index of a single section, or cluster entry tuple
+
+        self._groups = []
+        # list of (lo, hi, end) tuples;
+        # lo and hi refer to the section index,
+        # end is the latest end of the grouped sections
+        sectionStarts = sectionIndex.starts
+        if lowerLevel is None:
+            lowerGroups = [
+                (i, i + 1, start + duration)
+                for i, (start, duration) in enumerate(
+                    zip(sectionStarts, sectionIndex.durations)
+                )
+            ]
+        else:
+            lowerGroups = lowerLevel._groups
+        for lo, hi, end in lowerGroups:
+            if self._groups:
+                groupLo, groupHi, groupEnd = self._groups[-1]
+                if sectionStarts[lo] - sectionStarts[groupHi - 1] < maxGap:
+                    self._groups[-1] = (groupLo, hi, max(groupEnd, end))
+                    continue
+
+            self._groups.append((lo, hi, end))
+
+        for lo, hi, end in self._groups:
+            start = sectionStarts[lo]
+            if hi - lo == 1:
+                self._entries.append(lo)
+                duration = sectionIndex.durations[lo]
+            else:
+                entry = self._make_cluster(lo, hi - lo, end)
+                self._entries.append(entry)
+                self.clusterRanges[entry[4]] = (start, end)
+                duration = end - start
+            self.starts.append(start)
+            self.durations.append(duration)
+            if duration > self.maxDuration:
+                self.maxDuration = duration
+
+    def __len__(self):
+        return len(self.starts)
+
+    def get_range(self, startTimestamp, endTimestamp):
+        """Return a tuple (lo, hi) of entry indices.
+
+        All entries intersecting the time range between
+        startTimestamp and endTimestamp are within the entries lo to hi-1.
+        """
+        lo = bisect_left(self.starts, startTimestamp - self.maxDuration)
+        hi = bisect_right(self.starts, endTimestamp, lo)
+        return lo, hi
+
+    def get_section(self, i):
+        """Return the i-th entry as a tuple: 
+
+        (timestamp, duration, title, timeStr, ID, color)
+        Single sections are taken over from the index.
+        Clusters have the index's current default color.
+        """
+        entry = self._entries[i]
+        if isinstance(entry, int):
+            return self._sectionIndex.get_section(entry)
+
+        sectionIndex = self._sectionIndex
+        return (*entry, sectionIndex.colors[sectionIndex.DEFAULT_COLOR_ID])
+
+    def get_time_str(self, i):
+        """Return the date/time label of the i-th entry."""
+        entry = self._entries[i]
+        if isinstance(entry, int):
+            return self._sectionIndex.get_time_str(entry)
+
+        return entry[3]
+
+    def get_title(self, i):
+        """Return the title of the i-th entry."""
+        entry = self._entries[i]
+        if isinstance(entry, int):
+            return self._sectionIndex.titles[entry]
+
+        return entry[2]
+
+    def _make_cluster(self, first, count, end):
+        """Return a cluster entry that looks like a section entry.
+        
+        first is the index row of the cluster's first section.
+        The entry has no color, because the default color
+        may change while the level is kept.
+        """
+        start = self._sectionIndex.starts[first]
+        span = get_duration_str(*get_duration(end - start)).strip()
+        return (
+            start,
+            end - start,
+            f"{count} {_('Sections')}",
+            span,
+            f'{self.CLUSTER_PREFIX}{self._sectionIndex.scIds[first]}',
+        )
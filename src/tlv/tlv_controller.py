@@ -5,18 +5,20 @@ For further information see https://github.com/peter88213/nv_tlview
 License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 """
 
-from datetime import datetime
-
+from tlv.tlv_draw_stats import TlvDrawStats
 from tlv.tlv_globals import prefs
-from tlv.tlv_helper import from_timestamp
 from tlv.tlv_helper import get_duration
 from tlv.tlv_helper import get_seconds
-from tlv.tlv_helper import get_specific_date
-from tlv.tlv_helper import get_timestamp
 from tlv.tlv_helper import get_unspecific_date
+from tlv.tlv_helper import parse_date_time
+from tlv.tlv_helper import parse_day_time
+from tlv.tlv_helper import timestamp_to_iso
+from tlv.tlv_index_loader import TlvIndexLoader
+from tlv.tlv_latency_tracer import TlvLatencyTracer
 from tlv.tlv_main_frame import TlvMainFrame
 from tlv.tlv_public_api import TlvPublicApi
 from tlv.tlv_section_canvas import TlvSectionCanvas
+from tlv.tlv_section_index import TlvSectionIndex
 
 
 class TlvController(TlvPublicApi):
@@ -38,8 +40,33 @@ class TlvController(TlvPublicApi):
             localize_date: Boolean 
                 - If True, display dates in localized format.
                 - If False, display dates in ISO-format.
+            packed_cascading: Boolean
+                - If True, put each section into the top free row.
+                - If False, begin a new cascade only after a gap.
+            draw_timing: Boolean
+                - If True, record the time and item count of each
+                  drawing stage, and of sorting the sections.
+            draw_timing_overlay: Boolean
+                - If True, display the draw timing on the timeline.
+                  Requires draw_timing.
+            latency_tracing: Boolean
+                - If True, measure the time from an input event
+                  to the end of the redraw it causes.
+            label_time_budget: int
+                - Milliseconds per chunk of section label creation.
+                  The default is 8.
         """
         self._dataModel = model
+        self.sectionIndex = TlvSectionIndex(self._dataModel, self)
+        # sorted sections, updated incrementally on refresh
+        self.drawStats = TlvDrawStats()
+        # timing samples, recorded if the draw_timing option is set
+        self.latencyTracer = TlvLatencyTracer()
+        # input latencies, measured if the latency_tracing option is set
+        self.isLoading = (
+            len(self._dataModel.sections) >= TlvIndexLoader.SECTIONS_MIN
+        )
+        # True while the section index is built in the background
 
         # Create the view component.
         self.view = TlvMainFrame(
@@ -58,6 +85,16 @@ class TlvController(TlvPublicApi):
         # hook for double-clicking a section marker
         self.view.get_canvas().bind('<<double-click>>', self._on_double_click)
 
+        self._indexLoader = None
+        if self.isLoading:
+            # Show the window while the sections are indexed.
+            self.view.set_loading(True)
+            self._indexLoader = TlvIndexLoader(
+                self.view,
+                self._on_index_loaded,
+            )
+            self._indexLoader.start(self._dataModel, self)
+
     def datestr(self, dt):
         """Return a localized date string, if the localize_date option is set.
         
@@ -87,15 +124,15 @@ class TlvController(TlvPublicApi):
                 scTime = section.time
 
             if section.date is not None:
-                scDate = section.date
+                timestamp, __ = parse_date_time(section.date, scTime)
             elif section.day is not None:
                 if refIso is None:
                     refIso = '0001-01-01'
-                scDate = get_specific_date(section.day, refIso)
+                timestamp, __ = parse_day_time(section.day, scTime, refIso)
             else:
                 return
 
-            return get_timestamp(datetime.fromisoformat(f'{scDate} {scTime}'))
+            return timestamp
 
         except:
             return
@@ -115,6 +152,9 @@ class TlvController(TlvPublicApi):
         if not self.isOpen:
             return
 
+        if self._indexLoader is not None:
+            self._indexLoader.cancel()
+            self._indexLoader = None
         self.view.on_quit()
         self.isOpen = False
 
@@ -129,17 +169,14 @@ class TlvController(TlvPublicApi):
         else:
             scTime = section.time
         if section.date is not None:
-            scDate = section.date
+            timestamp, __ = parse_date_time(section.date, scTime)
         elif section.day is not None:
-            scDate = get_specific_date(section.day, refIso)
+            timestamp, __ = parse_day_time(section.day, scTime, refIso)
         else:
-            scDate = refIso
+            timestamp, __ = parse_date_time(refIso, scTime)
 
-        timestamp = get_timestamp(
-            datetime.fromisoformat(f'{scDate} {scTime}')
-        ) + deltaSeconds
-        dt = from_timestamp(timestamp)
-        dateStr, timeStr = datetime.isoformat(dt).split('T')
+        timestamp += deltaSeconds
+        dateStr, timeStr = timestamp_to_iso(timestamp)
         section.time = timeStr
         if section.date is not None:
             section.date = dateStr
@@ -223,3 +260,12 @@ class TlvController(TlvPublicApi):
         if self.on_double_click is not None:
             self.on_double_click(scId)
 
+    def _on_index_loaded(self, sectionIndex):
+        """Show the sections indexed in the background."""
+        self._indexLoader = None
+        if sectionIndex is not None:
+            self.sectionIndex = sectionIndex
+        self.isLoading = False
+        self.view.set_loading(False)
+        self.view.fit_window()
+        # this also applies the changes made while loading
@@ -0,0 +1,81 @@
+"""Provide a class for the draw timing statistics.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from collections import deque
+from time import perf_counter
+
+from tlv.tlv_helper import get_percentile
+
+
+class TlvDrawStats:
+    """Ring buffer of the timing samples of the timeline operations.
+
+    A sample is a dictionary:
+        'operation': str -- e.g. 'draw_timeline' or 'refresh'.
+        'ms': float -- Total wall time in milliseconds.
+        'items': int -- Total item count.
+        'stages': dict -- (milliseconds, item count) tuples by stage name.
+    """
+
+    SAMPLES_MAX = 200
+    # the oldest samples are discarded
+
+    def __init__(self):
+        self._samples = deque(maxlen=self.SAMPLES_MAX)
+        self._sample = None
+        # the sample being recorded
+        self._stageStart = None
+
+    def begin(self, operation):
+        """Start recording a sample."""
+        self._sample = {
+            'operation': operation,
+            'ms': 0.0,
+            'items': 0,
+            'stages': {},
+        }
+        self._stageStart = perf_counter()
+
+    def commit(self):
+        """Add the recorded sample to the buffer."""
+        self._samples.append(self._sample)
+        self._sample = None
+
+    def end_stage(self, stage, itemCount):
+        """Record the time since the previous stage.
+
+        The time for counting the items is excluded
+        from the next stage.
+        """
+        ms = (perf_counter() - self._stageStart) * 1000
+        self._sample['stages'][stage] = (ms, itemCount)
+        self._sample['ms'] += ms
+        self._sample['items'] += itemCount
+        self._stageStart = perf_counter()
+
+    def get_last(self, operation):
+        """Return the most recent sample of an operation, or None."""
+        for sample in reversed(self._samples):
+            if sample['operation'] == operation:
+                return sample
+
+    def get_percentile(self, operation, percent):
+        """Return the nearest-rank percentile of an operation's times.
+
+        Return None, if there are no samples of the operation.
+        """
+        times = sorted(
+            sample['ms'] for sample in self._samples
+            if sample['operation'] == operation
+        )
+        if not times:
+            return None
+
+        return get_percentile(times, percent)
+
+    def get_samples(self):
+        """Return a list of the samples, oldest first."""
+        return list(self._samples)
@@ -7,9 +7,85 @@ License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
+from functools import lru_cache
+from math import ceil
 
 from tlv.tlv_locale import _
 
+# The integer civil date functions count dates in days since 0001-01-01,
+# and timestamps in seconds since datetime.min.
+MAX_DAYS = 3652058
+# days from 0001-01-01 to 9999-12-31
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+PARSE_CACHE_SIZE = 65536
+# maximum number of entries per parse cache
+
+
+def civil_from_days(days):
+    """Return a (year, month, day) tuple calculated from days."""
+    days += 306
+    # days since 0000-03-01
+    era = days // 146097
+    dayOfEra = days - era * 146097
+    yearOfEra = (
+        dayOfEra
+        - dayOfEra // 1460
+        + dayOfEra // 36524
+        - dayOfEra // 146096
+    ) // 365
+    dayOfYear = dayOfEra - (
+        365 * yearOfEra
+        + yearOfEra // 4
+        - yearOfEra // 100
+    )
+    monthIndex = (5 * dayOfYear + 2) // 153
+    # starting with March
+    day = dayOfYear - (153 * monthIndex + 2) // 5 + 1
+    if monthIndex < 10:
+        month = monthIndex + 3
+    else:
+        month = monthIndex - 9
+    year = yearOfEra + era * 400
+    if month <= 2:
+        year += 1
+    return year, month, day
+
+
+def clear_parse_cache():
+    """Discard the cached date/time parsing results."""
+    parse_date_time.cache_clear()
+    parse_day_time.cache_clear()
+
+
+def days_from_civil(year, month, day):
+    """Return the number of days since 0001-01-01."""
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    yearOfEra = year - era * 400
+    monthIndex = (month + 9) % 12
+    # starting with March
+    dayOfYear = (153 * monthIndex + 2) // 5 + day - 1
+    dayOfEra = (
+        yearOfEra * 365
+        + yearOfEra // 4
+        - yearOfEra // 100
+        + dayOfYear
+    )
+    return era * 146097 + dayOfEra - 306
+
+
+def days_to_iso(days):
+    """Return the ISO-formatted date calculated from days.
+
+    Raise OverflowError if the date is out of range.
+    """
+    if not 0 <= days <= MAX_DAYS:
+        raise OverflowError('date value out of range')
+
+    year, month, day = civil_from_days(days)
+    return f'{year:04}-{month:02}-{day:02}'
+
 
 def from_timestamp(ts):
     return datetime.min + timedelta(seconds=ts)
@@ -34,6 +110,33 @@ def get_duration_str(days, hours, minutes):
     return durationStr
 
 
+def get_parse_cache_info():
+    """Return a dictionary with the parse cache statistics.
+
+    Keys: 'hits', 'misses', 'size'.
+    """
+    hits = 0
+    misses = 0
+    size = 0
+    for cacheInfo in (
+        parse_date_time.cache_info(),
+        parse_day_time.cache_info(),
+    ):
+        hits += cacheInfo.hits
+        misses += cacheInfo.misses
+        size += cacheInfo.currsize
+    return {'hits': hits, 'misses': misses, 'size': size}
+
+
+def get_percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values.
+
+    values must not be empty.
+    """
+    rank = ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
 def get_seconds(days, hours, minutes):
     """Return seconds calculated from days, hours, and minutes."""
     seconds = 0
@@ -54,8 +157,7 @@ def get_specific_date(dayStr, refIso):
         refIso:str -- Reference date/time, formatted acc. to ISO 8601
     """
     # Calculate the section date from day and reference date.
-    refDate = date.fromisoformat(refIso)
-    return date.isoformat(refDate + timedelta(days=int(dayStr)))
+    return days_to_iso(iso_to_days(refIso) + int(dayStr))
 
 
 def get_timestamp(dt):
@@ -70,5 +172,161 @@ def get_unspecific_date(dateIso, refIso):
         refIso:str -- Reference date/time, formatted acc. to ISO 8601
     """
     # Calculate the section day from date and reference date.
-    refDate = date.fromisoformat(refIso)
-    return str((date.fromisoformat(dateIso) - refDate).days)
+    return str(iso_to_days(dateIso) - iso_to_days(refIso))
+
+
+def is_leap_year(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def iso_to_days(dateIso):
+    """Return the number of days since 0001-01-01.
+
+    Positional arguments:
+        dateIso:str -- Date, formatted acc. to ISO 8601
+
+    Raise ValueError in case of an invalid date.
+    """
+    if (
+        len(dateIso) == 10
+        and dateIso[4] == '-'
+        and dateIso[7] == '-'
+        and _is_digits(dateIso[:4])
+        and _is_digits(dateIso[5:7])
+        and _is_digits(dateIso[8:])
+    ):
+        year = int(dateIso[:4])
+        month = int(dateIso[5:7])
+        day = int(dateIso[8:])
+        if year > 0 and 0 < month <= 12:
+            monthDays = MONTH_DAYS[month - 1]
+            if month == 2 and is_leap_year(year):
+                monthDays += 1
+            if 0 < day <= monthDays:
+                return days_from_civil(year, month, day)
+
+    # Let the standard library handle the special cases.
+    return date.fromisoformat(dateIso).toordinal() - 1
+
+
+def iso_to_seconds(timeIso):
+    """Return the number of seconds since midnight.
+
+    Positional arguments:
+        timeIso:str -- Time, formatted acc. to ISO 8601 (hh:mm or hh:mm:ss)
+
+    Return None, if the time is not in one of these formats.
+    """
+    if len(timeIso) == 5:
+        timeIso = f'{timeIso}:00'
+    elif len(timeIso) != 8:
+        return None
+
+    if timeIso[2] != ':' or timeIso[5] != ':':
+        return None
+
+    if not (
+        _is_digits(timeIso[:2])
+        and _is_digits(timeIso[3:5])
+        and _is_digits(timeIso[6:])
+    ):
+        return None
+
+    hour = int(timeIso[:2])
+    minute = int(timeIso[3:5])
+    second = int(timeIso[6:])
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+
+    return hour * 3600 + minute * 60 + second
+
+
+def iso_to_timestamp(dateIso, timeIso):
+    """Return the timestamp of an ISO-formatted date and time.
+
+    Positional arguments:
+        dateIso:str -- Date, formatted acc. to ISO 8601
+        timeIso:str -- Time, formatted acc. to ISO 8601
+
+    The result is the same as
+    get_timestamp(datetime.fromisoformat(f'{dateIso} {timeIso}')).
+    Raise ValueError in case of an invalid date or time.
+    """
+    seconds = iso_to_seconds(timeIso)
+    if seconds is None:
+        # Let the standard library handle the special cases.
+        return get_timestamp(datetime.fromisoformat(f'{dateIso} {timeIso}'))
+
+    return iso_to_days(dateIso) * 86400 + seconds
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_date_time(dateIso, timeIso):
+    """Return a (timestamp, weekday) tuple.
+    
+    Positional arguments:
+        dateIso:str -- Date, formatted acc. to ISO 8601
+        timeIso:str -- Time, formatted acc. to ISO 8601
+
+    The weekday is an integer, where Monday is 0.
+    The results are cached.
+    Raise ValueError in case of an invalid date or time.
+    """
+    timestamp = iso_to_timestamp(dateIso, timeIso)
+    return timestamp, weekday_from_days(timestamp // 86400)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_day_time(dayStr, timeIso, refIso):
+    """Return a (timestamp, weekday) tuple.
+    
+    Positional arguments:
+        dayStr:str -- Day
+        timeIso:str -- Time, formatted acc. to ISO 8601
+        refIso:str -- Reference date/time, formatted acc. to ISO 8601
+
+    The weekday is an integer, where Monday is 0.
+    The results are cached.
+    Raise ValueError in case of an invalid day or time.
+    """
+    timestamp = iso_to_timestamp(get_specific_date(dayStr, refIso), timeIso)
+    return timestamp, weekday_from_days(timestamp // 86400)
+
+
+def split_timestamp(timestamp):
+    """Return a (days, hour, minute, second) tuple.
+
+    Positional arguments:
+        timestamp: int or float -- Seconds since datetime.min
+
+    Fractions of a second are truncated.
+    Raise OverflowError if the date is out of range.
+    """
+    days, seconds = divmod(int(timestamp), 86400)
+    if not 0 <= days <= MAX_DAYS:
+        raise OverflowError('date value out of range')
+
+    hour, seconds = divmod(seconds, 3600)
+    minute, second = divmod(seconds, 60)
+    return days, hour, minute, second
+
+
+def timestamp_to_iso(timestamp):
+    """Return a (dateIso, timeIso) tuple calculated from timestamp.
+
+    The result is the same as
+    datetime.isoformat(from_timestamp(timestamp)).split('T')
+    for an integer timestamp.
+    Raise OverflowError if the date is out of range.
+    """
+    days, hour, minute, second = split_timestamp(timestamp)
+    return days_to_iso(days), f'{hour:02}:{minute:02}:{second:02}'
+
+
+def weekday_from_days(days):
+    """Return the day of the week as an integer, where Monday is 0."""
+    return days % 7
+
+
+def _is_digits(text):
+    return text.isascii() and text.isdigit()
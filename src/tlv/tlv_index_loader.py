@@ -0,0 +1,88 @@
+"""Provide a class for building the section index in the background.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+import queue
+import threading
+
+from tlv.tlv_section_index import TlvSectionIndex
+
+
+class TlvIndexLoader:
+    """Build a section index on a worker thread.
+
+    The worker thread reads only a snapshot of the section data,
+    taken on the Tk thread. The new index is handed back to the Tk
+    thread through a queue that is polled with after().
+    """
+
+    POLL_INTERVAL = 50
+    # milliseconds between polling the queue
+    SECTIONS_MIN = 5000
+    # smaller projects are indexed on the Tk thread
+
+    def __init__(self, widget, onDone):
+        """Set up the loader.
+
+        Positional arguments:
+            widget -- Tk widget for scheduling the polling.
+            onDone -- Callback that takes the new section index,
+                      or None, if the index could not be built.
+                      Called on the Tk thread.
+        """
+        self._widget = widget
+        self._onDone = onDone
+        self._queue = queue.Queue()
+        self._cancelEvent = threading.Event()
+        self._pollId = None
+
+    def cancel(self):
+        """Stop polling, and stop the worker thread's update.
+
+        The worker thread checks for cancellation between
+        batches of sections, and discards the incomplete index.
+        """
+        self._cancelEvent.set()
+        if self._pollId is not None:
+            self._widget.after_cancel(self._pollId)
+            self._pollId = None
+
+    def start(self, model, tlvController):
+        """Start building a new section index for model."""
+        sectionIndex = TlvSectionIndex(model, tlvController)
+        snapshot = sectionIndex.get_snapshot()
+        worker = threading.Thread(
+            target=self._build,
+            args=(sectionIndex, snapshot),
+            daemon=True,
+        )
+        worker.start()
+        self._pollId = self._widget.after(self.POLL_INTERVAL, self._poll)
+
+    def _build(self, sectionIndex, snapshot):
+        # This runs on the worker thread.
+        try:
+            sectionIndex.update(snapshot, self._cancelEvent)
+        except:
+            sectionIndex = None
+            # the index will be built on the Tk thread
+        if not self._cancelEvent.is_set():
+            self._queue.put(sectionIndex)
+
+    def _poll(self):
+        self._pollId = None
+        if self._cancelEvent.is_set():
+            return
+
+        try:
+            sectionIndex = self._queue.get_nowait()
+        except queue.Empty:
+            self._pollId = self._widget.after(
+                self.POLL_INTERVAL,
+                self._poll,
+            )
+            return
+
+        self._onDone(sectionIndex)
@@ -0,0 +1,89 @@
+"""Provide a class for time interval queries.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from array import array
+
+
+class TlvIntervalTree:
+    """Priority search tree of time intervals sorted by start.
+
+    The intervals are referred to by their row index in the sorted order.
+    Each node holds the interval with the latest end of its subtree,
+    and splits the remaining intervals by row index.
+    The tree is balanced, so queries take O(log n + k) time,
+    where k is the number of intervals found.
+    """
+
+    def __init__(self, ends):
+        """Build the tree.
+
+        Positional arguments:
+            ends -- sequence of the interval end timestamps,
+                    ordered by the interval start timestamps.
+        """
+        self._ends = ends
+        self._nodeRows = array('l')
+        # row index of the node's interval
+        self._nodeSplits = array('l')
+        # first row index of the right subtree
+        self._leftNodes = array('l')
+        self._rightNodes = array('l')
+        # node indices of the subtrees; -1, if empty
+        self._root = self._build(list(range(len(ends))))
+
+    def query(self, hi, timestamp):
+        """Return a list of row indices in unspecified order.
+
+        Find the intervals with a row index below hi,
+        that end at or after timestamp.
+        """
+        ends = self._ends
+        found = []
+        if self._root == -1:
+            return found
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            row = self._nodeRows[node]
+            if ends[row] < timestamp:
+                # all intervals of the subtree end earlier
+                continue
+
+            if row < hi:
+                found.append(row)
+            left = self._leftNodes[node]
+            if left != -1:
+                stack.append(left)
+            right = self._rightNodes[node]
+            if right != -1 and self._nodeSplits[node] < hi:
+                stack.append(right)
+        return found
+
+    def _build(self, rows):
+        """Build a subtree from a sorted list of row indices.
+
+        Return the index of the subtree's root node, or -1, if empty.
+        """
+        if not rows:
+            return -1
+
+        ends = self._ends
+        top = 0
+        for i in range(1, len(rows)):
+            if ends[rows[i]] > ends[rows[top]]:
+                top = i
+        node = len(self._nodeRows)
+        self._nodeRows.append(rows.pop(top))
+        self._nodeSplits.append(-1)
+        self._leftNodes.append(-1)
+        self._rightNodes.append(-1)
+        if rows:
+            mid = len(rows) // 2
+            self._nodeSplits[node] = rows[mid]
+            self._leftNodes[node] = self._build(rows[:mid])
+            self._rightNodes[node] = self._build(rows[mid:])
+        return node
@@ -0,0 +1,116 @@
+"""Provide a class for measuring the input latency.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from collections import deque
+from time import perf_counter
+
+from tlv.tlv_helper import get_percentile
+
+
+class TlvLatencyTracer:
+    """Event-to-paint latency statistics.
+
+    An input event is timestamped when it arrives.
+    The redraw that follows takes over all events pending at its start,
+    and the latency is measured when the redraw has been flushed.
+    Events handled by the same redraw are counted as coalesced.
+    Events discarded without a redraw are counted as dropped.
+    """
+
+    BUCKET_LIMITS_MS = (8, 16, 33, 50, 100, 200, 500, 1000)
+    # upper bounds of the histogram buckets; the last bucket is open
+    FRAME_BUDGET_MS = 50
+    # latencies above this are counted as over budget
+    SAMPLES_MAX = 1000
+    # number of recent latencies kept for the percentiles
+
+    def __init__(self):
+        self.reset()
+
+    @property
+    def isPainting(self):
+        """True, if a redraw is waiting to be flushed."""
+        return bool(self._painting)
+
+    def add_event(self, name):
+        """Timestamp an incoming input event."""
+        self._pending.append((name, perf_counter()))
+
+    def drop_events(self):
+        """Discard the events that have not been painted."""
+        self._droppedCount += len(self._pending) + len(self._painting)
+        self._pending = []
+        self._painting = []
+
+    def end_paint(self):
+        """Record the latencies of the events of the flushed redraw."""
+        now = perf_counter()
+        for name, timestamp in self._painting:
+            latencyMs = (now - timestamp) * 1000
+            self._latencies.append(latencyMs)
+            self._eventCount += 1
+            if latencyMs > self.FRAME_BUDGET_MS:
+                self._overBudgetCount += 1
+            for i, limit in enumerate(self.BUCKET_LIMITS_MS):
+                if latencyMs <= limit:
+                    self._histogram[i] += 1
+                    break
+            else:
+                self._histogram[-1] += 1
+        self._painting = []
+
+    def get_stats(self):
+        """Return a dictionary with the latency statistics.
+
+        Keys:
+            'events': int -- Number of painted events.
+            'coalesced': int -- Events painted along with an earlier event.
+            'dropped': int -- Events discarded without painting.
+            'overBudget': int -- Events exceeding FRAME_BUDGET_MS.
+            'p50', 'p95', 'max': float -- Recent latencies in ms, or None.
+            'histogram': list -- (upper limit in ms, count) tuples.
+                                 The last limit is None.
+        """
+        latencies = sorted(self._latencies)
+        if latencies:
+            p50 = get_percentile(latencies, 50)
+            p95 = get_percentile(latencies, 95)
+            maxLatency = latencies[-1]
+        else:
+            p50 = p95 = maxLatency = None
+        return {
+            'events': self._eventCount,
+            'coalesced': self._coalescedCount,
+            'dropped': self._droppedCount,
+            'overBudget': self._overBudgetCount,
+            'p50': p50,
+            'p95': p95,
+            'max': maxLatency,
+            'histogram': list(
+                zip(self.BUCKET_LIMITS_MS + (None,), self._histogram)
+            ),
+        }
+
+    def reset(self):
+        self._pending = []
+        # (name, timestamp) tuples of the events waiting for a redraw
+        self._painting = []
+        # (name, timestamp) tuples of the events being painted
+        self._latencies = deque(maxlen=self.SAMPLES_MAX)
+        self._histogram = [0] * (len(self.BUCKET_LIMITS_MS) + 1)
+        self._eventCount = 0
+        self._coalescedCount = 0
+        self._droppedCount = 0
+        self._overBudgetCount = 0
+
+    def start_paint(self):
+        """Assign the pending events to the redraw that begins."""
+        if not self._pending:
+            return
+
+        self._coalescedCount += len(self._pending) - 1
+        self._painting.extend(self._pending)
+        self._pending = []
@@ -0,0 +1,492 @@
+"""Provide a class for the timeline layout.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from heapq import heappop
+from heapq import heappush
+from math import ceil
+
+from tlv.tlv_globals import DAY
+from tlv.tlv_globals import MONTH
+from tlv.tlv_globals import YEAR
+from tlv.tlv_helper import MAX_DAYS
+from tlv.tlv_helper import civil_from_days
+from tlv.tlv_helper import days_from_civil
+from tlv.tlv_helper import split_timestamp
+
+
+class TlvLayoutEngine:
+    """Timeline layout calculation, independent of the GUI toolkit.
+
+    The results are plain tuples, so the layout can be
+    calculated and measured without a display.
+    """
+
+    # Constants in pixels.
+    SC_EVENT_DIST_Y = 35
+    # vertical distance between section marks
+    SC_LABEL_DIST_X = 10
+    # horizontal distance between section mark and label
+    SC_MARK_HALF = 5
+    # half of the section marker's height
+    SC_CLUSTER_DIST = 3
+    # sections closer than this are merged into clusters
+
+    CHECKPOINT_STEP = 256
+    # number of sections between the saved layout states
+
+    # Calendar resolutions.
+    MONTH_STEPS = (1, 2, 3, 6)
+    # resolutions in months
+    YEAR_STEPS = (1, 2, 5)
+    # resolutions in years, repeated for each power of ten
+
+    def __init__(self, textWidth=None):
+        """Set the text measuring function.
+
+        Optional arguments:
+            textWidth -- Function that returns the width
+                         of a text in pixels.
+                         Required for the section layout.
+        """
+        self._textWidth = textWidth
+        self._checkpoints = []
+        # layout states saved every CHECKPOINT_STEP sections
+        self._checkpointKey = None
+        # (lod, change count, scale, minDist, packed) of the saved states
+        self._checkpointOrigin = None
+        # timestamp at the x origin of the saved states
+
+    def arrange_sections(
+        self,
+        sectionIndex,
+        startTimestamp,
+        scale,
+        minDist,
+        windowWidth,
+        packed=False,
+    ):
+        """Return the visible sections and their positions.
+
+        Positional arguments:
+            sectionIndex: TlvSectionIndex -- The sorted sections.
+            startTimestamp: int -- Timestamp at the left window edge.
+            scale: float -- Seconds per pixel.
+            minDist: int -- Minimum distance in pixels for cascading.
+            windowWidth: int -- Window width in pixels.
+
+        Optional arguments:
+            packed: Boolean -- If True, use the packed layout.
+
+        Return a tuple: (list of section records, row count)
+        The records are tuples:
+            (section, clusterRange, xStart, xEnd, yPos)
+        section is a tuple:
+            (timestamp, duration, title, timeStr, ID, color)
+        clusterRange is a (start, end) tuple for clusters,
+        and None for single sections.
+        The row count refers to the sections up to the right window edge.
+
+        The layout states are saved at intervals while the sections
+        are arranged, so with unchanged sections, scale and options,
+        e.g. when panning, the layout resumes near the window.
+        """
+        lod = sectionIndex.get_lod(scale * self.SC_CLUSTER_DIST)
+        # sections at a level of detail that fits the scale
+        if packed:
+            arrange = self._pack
+        else:
+            arrange = self._cascade
+        checkpoints, origin = self._get_checkpoints(
+            (lod, sectionIndex.changeCount, scale, minDist, packed),
+            startTimestamp,
+        )
+        visibleSections, rowCount = arrange(
+            startTimestamp,
+            scale,
+            lod,
+            minDist,
+            windowWidth,
+            checkpoints,
+            origin,
+        )
+        records = []
+        for i, xStart, xEnd, yPos in visibleSections:
+            section = lod.get_section(i)
+            records.append((
+                section,
+                lod.clusterRanges.get(section[4], None),
+                xStart,
+                xEnd,
+                yPos,
+            ))
+        return records, rowCount
+
+    def get_label_end(self, xEnd, title, timeStr):
+        """Return the right edge of a section's mark and labels."""
+        textWidth = max(
+            self._textWidth(title or ''),
+            self._textWidth(timeStr),
+        )
+        return max(
+            xEnd + self.SC_MARK_HALF,
+            xEnd + self.SC_LABEL_DIST_X + textWidth,
+        )
+
+    def get_minor_resolution(self, majorResolution, units, scale, spacingMin):
+        """Return a tuple: (minor resolution, spacing in pixels, units).
+
+        The minor scale divides the major scale.
+        With months or years as units, the minor scale is a
+        calendar step that properly divides the major scale.
+        If there is none with a spacing of at least spacingMin,
+        there is no minor scale, and all values are None.
+        """
+        if units >= 2:
+            majorMonths = self._get_months(majorResolution)
+            resolution = MONTH
+            while resolution < majorResolution:
+                if (
+                    resolution / scale >= spacingMin
+                    and majorMonths % self._get_months(resolution) == 0
+                ):
+                    if resolution < YEAR:
+                        return resolution, resolution / scale, 2
+
+                    return resolution, resolution / scale, 3
+
+                resolution, __ = self._get_next_calendar_step(resolution)
+            return None, None, None
+
+        resolution = majorResolution / 4
+        spacing = resolution / scale
+        while spacing < spacingMin:
+            resolution *= 2
+            if units == 0 and resolution >= DAY:
+                resolution = DAY
+            elif units == 1 and resolution >= YEAR:
+                resolution = YEAR
+            spacing = resolution / scale
+        return resolution, spacing, units
+
+    def get_resolution(self, scale, resolution, spacingMin):
+        """Return a tuple: (resolution, spacing in pixels, units).
+
+        Start with resolution in seconds, and double it
+        until the scale lines are at least spacingMin pixels apart.
+        Months and years are increased by calendar steps,
+        i.e. MONTH_STEPS and YEAR_STEPS.
+        Units: 0=hours, 1=days, 2=months, 3=years.
+        """
+        spacing = resolution / scale
+        units = 0
+        while spacing < spacingMin:
+            if units >= 2:
+                resolution, units = self._get_next_calendar_step(resolution)
+            else:
+                resolution *= 2
+                if units == 0 and resolution >= DAY:
+                    resolution = DAY
+                    units = 1
+                elif units == 1 and resolution >= MONTH:
+                    resolution = MONTH
+                    units = 2
+            spacing = resolution / scale
+        return resolution, spacing, units
+
+    def get_scale_lines(
+        self,
+        resolution,
+        tsFrom,
+        tsTo,
+        startTimestamp,
+        scale,
+        calendar=False,
+    ):
+        """Generate (xPos, timestamp, days, hour, minute) tuples.
+
+        Each tuple describes a scale line. The scale lines are placed
+        at multiples of resolution between tsFrom (included)
+        and tsTo (excluded).
+        The date is given in days since 0001-01-01.
+
+        Optional arguments:
+            calendar: Boolean -- If True, place the scale lines
+                                 at the beginning of months or years.
+                                 resolution must be a calendar step
+                                 returned by get_resolution().
+        """
+        tsFrom = max(tsFrom, 0)
+        tsTo = min(tsTo, (MAX_DAYS + 1) * DAY)
+        # the time range is clipped to the valid dates
+        if calendar:
+            timestamps = self._get_calendar_timestamps(
+                resolution,
+                tsFrom,
+                tsTo,
+            )
+        else:
+            timestamps = self._get_timestamps(resolution, tsFrom, tsTo)
+        for timestamp in timestamps:
+            days, hour, minute, __ = split_timestamp(timestamp)
+            xPos = (timestamp - startTimestamp) / scale
+            yield xPos, timestamp, days, hour, minute
+
+    def _cascade(
+        self,
+        startTimestamp,
+        scale,
+        lod,
+        minDist,
+        windowWidth,
+        checkpoints,
+        origin,
+    ):
+        """Return the visible sections and their positions.
+
+        Return a tuple: (list of the visible sections, row count)
+        The list elements are tuples: (index, xStart, xEnd, yPos)
+        A new cascade begins at the top row, if a section starts
+        after the labels of all preceding sections.
+        The sections preceding the visible time range are cascaded
+        without being returned, so the rows are the same as if
+        all sections were drawn.
+        The date labels of the preceding sections are only formatted
+        and measured, if they might make a difference.
+
+        The cascade resumes at the last saved state before the
+        visible sections, and extends the list of checkpoints.
+        The saved positions refer to the origin timestamp.
+        """
+        starts = lod.starts
+        durations = lod.durations
+        yStart = self.SC_EVENT_DIST_Y
+        pending = []
+        # (index, xEnd) of the sections with date labels not yet measured
+        visibleSections = []
+
+        # Get the sections that intersect the visible time range.
+        endTimestamp = startTimestamp + windowWidth * scale
+        lo, hi = lod.get_range(startTimestamp, endTimestamp)
+
+        k = min(lo // self.CHECKPOINT_STEP, len(checkpoints) - 1)
+        if k < 0:
+            iStart = 0
+            yPos = yStart
+            labelEnd = 0
+            xRight = None
+            # right edge of the sections cascaded so far,
+            # assuming that the pending sections have only a title
+            yBottom = 0
+            # position of the lowest row
+        else:
+            iStart = k * self.CHECKPOINT_STEP
+            yPos, labelEnd, xRight, yBottom = checkpoints[k]
+        for i in range(iStart, hi):
+            if i == len(checkpoints) * self.CHECKPOINT_STEP:
+                # Save the state with all date labels measured.
+                if pending:
+                    xRight = self._get_pending_end(lod, pending, xRight)
+                    pending = []
+                    labelEnd = xRight
+                checkpoints.append((yPos, labelEnd, xRight, yBottom))
+            timestamp = starts[i]
+            durationSeconds = durations[i]
+            xStart = (timestamp - origin) / scale
+            xEnd = (timestamp - origin + durationSeconds) / scale
+            isVisible = (
+                i >= lo
+                and timestamp + durationSeconds >= startTimestamp
+            )
+
+            # Cascade sections.
+            if xStart > labelEnd + minDist and pending:
+                # The date labels might prevent a new cascade.
+                xRight = self._get_pending_end(lod, pending, xRight)
+                pending = []
+                labelEnd = xRight
+            if xStart > labelEnd + minDist:
+                yPos = yStart
+            if isVisible:
+                timeStr = lod.get_time_str(i)
+            else:
+                timeStr = ''
+                pending.append((i, xEnd))
+            x2 = self.get_label_end(xEnd, lod.get_title(i), timeStr)
+            if xRight is None or x2 > xRight:
+                xRight = x2
+            labelEnd = xRight
+            if isVisible:
+                visibleSections.append((
+                    i,
+                    (timestamp - startTimestamp) / scale,
+                    (timestamp - startTimestamp + durationSeconds) / scale,
+                    yPos,
+                ))
+            if yPos > yBottom:
+                yBottom = yPos
+            yPos += self.SC_EVENT_DIST_Y
+        return visibleSections, yBottom // self.SC_EVENT_DIST_Y
+
+    def _get_calendar_timestamps(self, resolution, tsFrom, tsTo):
+        """Generate the timestamps of month or year beginnings.
+
+        The months are counted from year 0, so the scale lines
+        fall on quarters, decades, centuries etc.
+        Only the months within the time range are calculated.
+        """
+        months = self._get_months(resolution)
+        year, month, __ = civil_from_days(int(tsFrom) // DAY)
+        monthIndex = -(-(year * 12 + month - 1) // months) * months
+        # the first multiple of months not before tsFrom's month
+        while True:
+            year, month = divmod(monthIndex, 12)
+            timestamp = days_from_civil(year, month + 1, 1) * DAY
+            if timestamp >= tsTo:
+                return
+
+            if timestamp >= tsFrom:
+                yield timestamp
+            monthIndex += months
+
+    def _get_checkpoints(self, key, startTimestamp):
+        """Return a tuple: (list of saved layout states, origin timestamp).
+
+        The saved states are discarded, if the key has changed.
+        """
+        if key != self._checkpointKey:
+            self._checkpointKey = key
+            self._checkpoints = []
+            self._checkpointOrigin = startTimestamp
+        return self._checkpoints, self._checkpointOrigin
+
+    def _get_months(self, resolution):
+        """Return the number of months of a calendar resolution."""
+        if resolution < YEAR:
+            return resolution // MONTH
+
+        return resolution // YEAR * 12
+
+    def _get_next_calendar_step(self, resolution):
+        """Return the next coarser calendar resolution and its units."""
+        if resolution < YEAR:
+            months = resolution // MONTH
+            for step in self.MONTH_STEPS:
+                if step > months:
+                    return step * MONTH, 2
+
+            return YEAR, 3
+
+        years = resolution // YEAR
+        magnitude = 1
+        while True:
+            for step in self.YEAR_STEPS:
+                if step * magnitude > years:
+                    return step * magnitude * YEAR, 3
+
+            magnitude *= 10
+
+    def _get_pending_end(self, lod, pending, xRight):
+        """Return xRight, extended by the pending sections' date labels.
+
+        pending is a list of (index, xEnd) tuples.
+        """
+        for j, xEndPending in pending:
+            x2 = self.get_label_end(
+                xEndPending,
+                lod.get_title(j),
+                lod.get_time_str(j),
+            )
+            if x2 > xRight:
+                xRight = x2
+        return xRight
+
+    def _get_timestamps(self, resolution, tsFrom, tsTo):
+        """Generate the multiples of resolution within the time range."""
+        tick = ceil(tsFrom / resolution)
+        timestamp = tick * resolution
+        while timestamp < tsTo:
+            yield timestamp
+            tick += 1
+            timestamp = tick * resolution
+
+    def _pack(
+        self,
+        startTimestamp,
+        scale,
+        lod,
+        minDist,
+        windowWidth,
+        checkpoints,
+        origin,
+    ):
+        """Return the visible sections and their positions.
+
+        Return a tuple: (list of the visible sections, row count)
+        The list elements are tuples: (index, xStart, xEnd, yPos)
+        The sections are assigned to rows in the order of their start.
+        Each section takes the top row that is free at its start,
+        i.e. the row's last label ends more than minDist before.
+        The sections preceding the visible time range are packed
+        without being returned, so the rows are the same as if
+        all sections were drawn.
+
+        The packing resumes at the last saved state before the
+        visible sections, and extends the list of checkpoints.
+        The saved positions refer to the origin timestamp.
+        """
+        starts = lod.starts
+        durations = lod.durations
+        visibleSections = []
+
+        # Get the sections that intersect the visible time range.
+        endTimestamp = startTimestamp + windowWidth * scale
+        lo, hi = lod.get_range(startTimestamp, endTimestamp)
+
+        k = min(lo // self.CHECKPOINT_STEP, len(checkpoints) - 1)
+        if k < 0:
+            iStart = 0
+            busyRows = []
+            # heap of (label end, row) tuples
+            freeRows = []
+            # heap of rows that became free again
+            rowCount = 0
+        else:
+            iStart = k * self.CHECKPOINT_STEP
+            busyRows, freeRows, rowCount = checkpoints[k]
+            busyRows = busyRows[:]
+            freeRows = freeRows[:]
+            # the saved heaps are kept unchanged
+        for i in range(iStart, hi):
+            if i == len(checkpoints) * self.CHECKPOINT_STEP:
+                checkpoints.append((busyRows[:], freeRows[:], rowCount))
+            timestamp = starts[i]
+            durationSeconds = durations[i]
+            xStart = (timestamp - origin) / scale
+            xEnd = (timestamp - origin + durationSeconds) / scale
+
+            # Release the rows whose labels end before the section starts.
+            while busyRows and xStart > busyRows[0][0] + minDist:
+                heappush(freeRows, heappop(busyRows)[1])
+            if freeRows:
+                row = heappop(freeRows)
+            else:
+                row = rowCount
+                rowCount += 1
+            x2 = self.get_label_end(
+                xEnd,
+                lod.get_title(i),
+                lod.get_time_str(i),
+            )
+            heappush(busyRows, (x2, row))
+            if i >= lo and timestamp + durationSeconds >= startTimestamp:
+                yPos = (row + 1) * self.SC_EVENT_DIST_Y
+                visibleSections.append((
+                    i,
+                    (timestamp - startTimestamp) / scale,
+                    (timestamp - startTimestamp + durationSeconds) / scale,
+                    yPos,
+                ))
+        return visibleSections, rowCount
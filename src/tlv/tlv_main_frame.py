@@ -5,7 +5,6 @@ For further information see https://github.com/peter88213/nv_tlview
 License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 """
 
-from calendar import day_abbr
 from datetime import datetime
 from tkinter import ttk
 
@@ -16,11 +15,7 @@ from tlv.tlv_globals import DAY
 from tlv.tlv_globals import HOUR
 from tlv.tlv_globals import YEAR
 from tlv.tlv_globals import prefs
-from tlv.tlv_helper import get_duration_str
-from tlv.tlv_helper import get_seconds
-from tlv.tlv_helper import get_specific_date
 from tlv.tlv_helper import get_timestamp
-from tlv.tlv_locale import _
 from tlv.tlv_scale_canvas import TlvScaleCanvas
 from tlv.tlv_scroll_frame import TlvScrollFrame
 from tlv.tlv_section_canvas import TlvSectionCanvas
@@ -63,7 +58,8 @@ class TlvMainFrame(ttk.Frame):
         self._specificDate = None
         self.firstTimestamp = None
         self.lastTimestamp = None
-        self.srtSections = None
+        self._redrawId = None
+        # ID of the scheduled redraw, if any
 
         #--- Canvas position.
         self._xPos = None
@@ -89,7 +85,7 @@ class TlvMainFrame(ttk.Frame):
             self._startTimestamp = self.MAX_TIMESTAMP
         else:
             self._startTimestamp = newVal
-        self.draw_timeline()
+        self.request_redraw()
 
     @property
     def scale(self):
@@ -103,7 +99,7 @@ class TlvMainFrame(ttk.Frame):
             self._scale = self.SCALE_MAX
         else:
             self._scale = newVal
-        self.draw_timeline()
+        self.request_redraw()
 
     @property
     def minDist(self):
@@ -117,7 +113,7 @@ class TlvMainFrame(ttk.Frame):
             self._minDist = self.DISTANCE_MAX
         else:
             self._minDist = newVal
-        self.draw_timeline()
+        self.request_redraw()
 
     def draw_timeline(self, event=None):
         if self._calculating:
@@ -126,31 +122,54 @@ class TlvMainFrame(ttk.Frame):
         self._calculating = True
         if self.startTimestamp is None:
             self.startTimestamp = self.firstTimestamp
+        self._cancel_redraw()
+        latencyTracer = self._tlvCtrl.latencyTracer
+        latencyTracer.start_paint()
         self.tlFrame.draw_timeline(
             self.startTimestamp,
             self.scale,
-            self.srtSections,
+            self._tlvCtrl.sectionIndex,
             self.minDist,
             self._specificDate,
             self._dataModel.referenceDate,
         )
+        if latencyTracer.isPainting:
+            self.after_idle(latencyTracer.end_paint)
         self._calculating = False
 
     def fit_window(self):
+        if self._tlvCtrl.isLoading:
+            # The window is fitted when the sections are loaded.
+            return
+
         self.sort_sections()
         width = self.tlFrame.get_window_width() - 2 * self.PAD_X
         self.scale = (self.lastTimestamp - self.firstTimestamp) / width
         self._set_first_section()
 
+    def fit_range(self, startTimestamp, endTimestamp):
+        width = self.tlFrame.get_window_width() - 2 * self.PAD_X
+        self.scale = (endTimestamp - startTimestamp) / width
+        self.startTimestamp = startTimestamp - self.PAD_X * self.scale
+
+    def flush_redraw(self):
+        """Perform a pending redraw immediately."""
+        if self._redrawId is not None:
+            self.draw_timeline()
+
     def get_canvas(self):
         return self.tlFrame.get_canvas()
 
     def go_to_first(self):
+        self._trace_input('go_to_first')
         xPos = self._set_first_section()
+        self.flush_redraw()
         self.tlFrame.draw_indicator(xPos)
 
     def go_to_last(self):
+        self._trace_input('go_to_last')
         xPos = self._set_last_section()
+        self.flush_redraw()
         self.tlFrame.draw_indicator(xPos)
 
     def go_to(self, scId):
@@ -163,6 +182,7 @@ class TlvMainFrame(ttk.Frame):
 
         xPos = self.tlFrame.get_window_width() / 2
         self.startTimestamp = sectionTimestamp - xPos * self.scale
+        self.flush_redraw()
         self.tlFrame.draw_indicator(
             xPos,
             text=self._tlvCtrl.get_section_title(scId),
@@ -170,6 +190,7 @@ class TlvMainFrame(ttk.Frame):
 
     def stretch_time_scale(self, event):
         """Stretch the time scale using the mouse wheel."""
+        self._trace_input('stretch_time_scale')
         deltaScale = 1.1
         if event.num == 5 or event.delta == -120:
             self.scale *= deltaScale
@@ -179,6 +200,7 @@ class TlvMainFrame(ttk.Frame):
 
     def adjust_cascading(self, event):
         """Change the distance for cascading sections using the mouse wheel."""
+        self._trace_input('adjust_cascading')
         deltaDist = 10
         if event.num == 5 or event.delta == -120:
             self.minDist += deltaDist
@@ -187,6 +209,7 @@ class TlvMainFrame(ttk.Frame):
         return 'break'
 
     def increase_scale(self):
+        self._trace_input('increase_scale')
         self.scale /= 2
 
     def lock(self):
@@ -195,6 +218,7 @@ class TlvMainFrame(ttk.Frame):
 
     def move_time_scale(self, event):
         """Move the time scale horizontally using the mouse wheel."""
+        self._trace_input('move_time_scale')
         deltaOffset = (
             self.scale
             / self.SCALE_MIN
@@ -206,29 +230,44 @@ class TlvMainFrame(ttk.Frame):
         return 'break'
 
     def on_quit(self):
+        self._cancel_redraw()
+        self._tlvCtrl.latencyTracer.drop_events()
         self.tlFrame.destroy()
         # this is necessary for deleting the event bindings
         self.destroy()
 
     def page_back(self):
+        self._trace_input('page_back')
         deltaX = self.tlFrame.get_window_width() * 0.9 * self.scale
         self.startTimestamp -= deltaX
 
     def page_forward(self):
+        self._trace_input('page_forward')
         deltaX = self.tlFrame.get_window_width() * 0.9 * self.scale
         self.startTimestamp += deltaX
 
     def reduce_scale(self):
+        self._trace_input('reduce_scale')
         self.scale *= 2
 
+    def request_redraw(self, event=None):
+        """Schedule a redraw of the timeline when Tk is idle.
+        
+        Multiple requests are coalesced into a single redraw.
+        """
+        if self._redrawId is None:
+            self._redrawId = self.after_idle(self.draw_timeline)
+
     def reset_casc(self):
         self.minDist = 0
 
     def scroll_back(self):
+        self._trace_input('scroll_back')
         deltaX = self.tlFrame.get_window_width() * 0.2 * self.scale
         self.startTimestamp -= deltaX
 
     def scroll_forward(self):
+        self._trace_input('scroll_forward')
         deltaX = self.tlFrame.get_window_width() * 0.2 * self.scale
         self.startTimestamp += deltaX
 
@@ -250,6 +289,10 @@ class TlvMainFrame(ttk.Frame):
                 self.SCALE_SPACING_MAX - TlvScaleCanvas.SCALE_SPACING_MIN
         )
 
+    def set_loading(self, isLoading):
+        """Show or hide the loading state."""
+        self.tlFrame.show_loading(isLoading)
+
     def set_year_scale(self):
         self.scale = (
             YEAR * 2) / (
@@ -257,82 +300,15 @@ class TlvMainFrame(ttk.Frame):
         )
 
     def sort_sections(self):
-        srtSections = []
-        # list of tuples to sort by timestamp
-        self._specificDate = False
-        for scId in self._dataModel.sections:
-            section = self._dataModel.sections[scId]
-            if section.scType != 0:
-                continue
-
-            try:
-                durationStr = get_duration_str(
-                    section.lastsDays,
-                    section.lastsHours,
-                    section.lastsMinutes,
-                )
-                refIso = self._dataModel.referenceDate
-                if section.time is None:
-                    if not prefs.get(
-                        'substitute_missing_time',
-                        False
-                    ):
-                        continue
-
-                    scTime = '00:00'
-                else:
-                    scTime = section.time
-
-                if section.date is not None:
-                    self._specificDate = True
-                    scDate = section.date
-                    dt = datetime.fromisoformat(f'{scDate} {scTime}')
-                    weekDay = day_abbr[dt.weekday()]
-                    timeStr = (
-                        f"{weekDay} {self._tlvCtrl.datestr(dt)} "
-                        f"{dt.hour:02}:{dt.minute:02}{durationStr}"
-                    )
-                elif section.day is not None:
-                    if refIso is None:
-                        refIso = '0001-01-01'
-                        showWeekDay = False
-                    else:
-                        showWeekDay = True
-                    scDate = get_specific_date(section.day, refIso)
-                    dt = datetime.fromisoformat(f'{scDate} {scTime}')
-                    if showWeekDay:
-                        weekDay = f'{day_abbr[dt.weekday()]} '
-                    else:
-                        weekDay = ''
-                    timeStr = (
-                        f"{weekDay}{_('Day')} {section.day} "
-                        f"{dt.hour:02}:{dt.minute:02}{durationStr}"
-                    )
-                else:
-                    continue
-
-                sectionColor = section.color or prefs['color_section_mark']
-                srtSections.append(
-                    (
-                        get_timestamp(dt),
-                        get_seconds(
-                            section.lastsDays,
-                            section.lastsHours,
-                            section.lastsMinutes,
-                        ),
-                        section.title,
-                        timeStr,
-                        scId,
-                        sectionColor,
-                    )
-                )
-            except:
-                pass
-        self.srtSections = sorted(srtSections)
-        if len(self.srtSections) > 1:
-            self.firstTimestamp = self.srtSections[0][0]
+        sectionIndex = self._tlvCtrl.sectionIndex
+        if not self._tlvCtrl.isLoading:
+            # Otherwise, the index is being built in the background.
+            self._update_index(sectionIndex)
+        self._specificDate = sectionIndex.specificDate
+        if len(sectionIndex) > 1:
+            self.firstTimestamp = sectionIndex.starts[0]
             self.lastTimestamp = (
-                self.srtSections[-1][0] + self.srtSections[-1][1]
+                sectionIndex.starts[-1] + sectionIndex.durations[-1]
             )
         else:
             self.firstTimestamp = self.MIN_TIMESTAMP
@@ -345,7 +321,7 @@ class TlvMainFrame(ttk.Frame):
     def _bind_events(self):
         self._calculating = False
         # semaphore to prevent overflow
-        self.bind('<Configure>', self.draw_timeline)
+        self.bind('<Configure>', self.request_redraw)
 
         # Bind mouse events to the canvas.
         if PLATFORM == 'win':
@@ -378,12 +354,32 @@ class TlvMainFrame(ttk.Frame):
         for sequence, callback in event_callbacks.items():
             self.tlFrame.bind_section_canvas_event(sequence, callback)
 
+    def _cancel_redraw(self):
+        if self._redrawId is not None:
+            self.after_cancel(self._redrawId)
+            self._redrawId = None
+
     def _on_drag(self, event):
-        # Move the time scale.
+        # Move the time scale by shifting the existing items.
+        self._trace_input('drag')
         deltaX = self._xPos - event.x
         self._xPos = event.x
         deltaSeconds = deltaX * self.scale
-        self.startTimestamp += deltaSeconds
+        self.flush_redraw()
+        self._startTimestamp = min(
+            max(self._startTimestamp + deltaSeconds, self.MIN_TIMESTAMP),
+            self.MAX_TIMESTAMP
+        )
+        latencyTracer = self._tlvCtrl.latencyTracer
+        latencyTracer.start_paint()
+        self.tlFrame.pan_timeline(
+            self._startTimestamp,
+            self.scale,
+            self._tlvCtrl.sectionIndex,
+            self.minDist,
+        )
+        if latencyTracer.isPainting:
+            self.after_idle(latencyTracer.end_paint)
 
         # Scroll vertically.
         deltaY = self._yPos - event.y
@@ -410,6 +406,9 @@ class TlvMainFrame(ttk.Frame):
         self.tlFrame.unbind_all(MOUSE.RIGHT_MOTION)
         self.tlFrame.set_normal_scrolling()
 
+        # Lay out the timeline after dragging.
+        self.request_redraw()
+
     def _set_first_section(self):
         xPos = self.PAD_X
         self.startTimestamp = self.firstTimestamp - xPos * self.scale
@@ -422,3 +421,20 @@ class TlvMainFrame(ttk.Frame):
         self.startTimestamp = self.lastTimestamp - xPos * self.scale
         return xPos
 
+    def _trace_input(self, name):
+        """Timestamp an input event, if the latency_tracing option is set."""
+        if prefs.get('latency_tracing', False):
+            self._tlvCtrl.latencyTracer.add_event(name)
+
+    def _update_index(self, sectionIndex):
+        """Synchronize the section index with the data model."""
+        isTimed = prefs.get('draw_timing', False)
+        if isTimed:
+            self._tlvCtrl.drawStats.begin('refresh')
+        sectionIndex.update()
+        if isTimed:
+            self._tlvCtrl.drawStats.end_stage(
+                'sort_sections',
+                len(sectionIndex),
+            )
+            self._tlvCtrl.drawStats.commit()
@@ -4,14 +4,16 @@ Copyright (c) Peter Triesberger
 For further information see https://github.com/peter88213/nv_tlview
 License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 """
-from _datetime import date
+from bisect import bisect_left
 from calendar import day_abbr
 from calendar import month_abbr
+from datetime import date
 
+import tkinter as tk
 from tlv.tlv_globals import HOUR
 from tlv.tlv_globals import prefs
-from tlv.tlv_helper import from_timestamp
-from tlv.tlv_helper import get_unspecific_date
+from tlv.tlv_helper import civil_from_days
+from tlv.tlv_helper import weekday_from_days
 from tlv.tlv_locale import _
 from tlv.tlv_scale_canvas import TlvScaleCanvas
 
@@ -34,6 +36,18 @@ class TlvOverviewCanvas(TlvScaleCanvas):
 
     def __init__(self, tlvController, master=None, **kw):
         super().__init__(tlvController, master, **kw)
+        self._windowMark = None
+        self._windowMarkStart = None
+        self._densityImage = None
+        self._densityItem = None
+        self._spareImage = None
+        # the density strip is shifted by copying it to this image
+        self._densityStart = None
+        # timestamp at the left edge of the density strip
+        self._rgbColors = {}
+        # cache for color names converted to "#rrggbb"
+        self._sectionIndex = None
+        self._background = None
 
     def draw(
         self,
@@ -41,88 +55,284 @@ class TlvOverviewCanvas(TlvScaleCanvas):
         scale,
         specificDate,
         refIso,
-        srtSections,
+        sectionIndex,
         background,
     ):
         self['background'] = background
-        self.delete("all")
-        if not specificDate:
-            if refIso is None:
-                refIso = '0001-01-01'
-
-        #--- Draw the regular scale window mark.
+        self._set_date_mode(specificDate, refIso)
         scale *= self.OV_SCALE_RATIO
         xMax = self.get_window_width()
         windowMarkWidth = xMax / self.OV_SCALE_RATIO
         windowMarkStart = windowMarkWidth * (self.OV_SCALE_RATIO // 2)
-        self.create_rectangle(
-            windowMarkStart,
-            0,
-            windowMarkStart + windowMarkWidth,
-            self.CANVAS_HEIGHT,
-            fill=prefs['color_window_mark'],
-            width=0,
-        )
 
         #--- Draw the overview scale.
         startTimestamp -= (windowMarkStart * scale)
-        resolution, self.majorSpacing, units = self._calculate_resolution(
+        self._windowMarkStart = windowMarkStart
+        (
+            majorResolution,
+            self.majorSpacing,
+            units,
+        ) = self._layout.get_resolution(
             scale,
             HOUR,
             self.SCALE_SPACING_MIN * self.OV_SPACING_RATIO,
         )
-        xPos, timestamp = self._calculate_first_scale_line(
-            resolution,
-            startTimestamp,
+        drawKey = (
             scale,
+            majorResolution,
+            units,
+            specificDate,
+            self._refIso,
+            prefs['color_major_scale'],
+            prefs['color_window_mark'],
         )
+        if drawKey == self._drawKey:
+            super().pan(startTimestamp)
+        else:
+            self._drawKey = drawKey
+            self._startTimestamp = startTimestamp
+            self._scale = scale
+            self._majorResolution = majorResolution
+            self._units = units
+            self._draw_scales(startTimestamp, True)
 
-        while xPos < xMax:
-            try:
-                dt = from_timestamp(timestamp)
-            except OverflowError:
-                break
-
-            if specificDate:
-                month = month_abbr[dt.month]
-                weekDay = day_abbr[dt.weekday()]
-                if units == 0:
-                    dtStr = f"{weekDay} {dt.hour:02}:{dt.minute:02}"
-                elif units == 1:
-                    dtStr = self._tlvCtrl.datestr(dt)
-                elif units == 2:
-                    dtStr = f"{month} {dt.year}"
-                elif units == 3:
-                    dtStr = f"{dt.year}"
-            else:
-                day = get_unspecific_date(date.isoformat(dt), refIso)
-                if units == 0:
-                    dtStr = f"{_('Day')} {day} {dt.hour:02}:{dt.minute:02}"
-                else:
-                    dtStr = f"{_('Day')} {day}"
-
-            self.create_text(
-                (xPos + 5, self.OV_DATE_POS),
-                text=dtStr,
-                fill=prefs['color_major_scale'],
-                anchor='nw',
+        #--- Draw the regular scale window mark.
+        if self._windowMark is None:
+            self._windowMark = self.create_rectangle(
+                windowMarkStart,
+                0,
+                windowMarkStart + windowMarkWidth,
+                self.CANVAS_HEIGHT,
+                fill=prefs['color_window_mark'],
+                width=0,
+            )
+        else:
+            self.coords(
+                self._windowMark,
+                windowMarkStart,
+                0,
+                windowMarkStart + windowMarkWidth,
+                self.CANVAS_HEIGHT,
+            )
+            self.itemconfigure(
+                self._windowMark,
+                fill=prefs['color_window_mark'],
+            )
+
+        #--- Draw the section density.
+        self._sectionIndex = sectionIndex
+        self._background = background
+        self._draw_density()
+
+    def pan(self, startTimestamp):
+        """Shift the overview horizontally without redrawing it.
+
+        The regular scale window mark stays in place.
+        Extends the superclass method.
+        """
+        startTimestamp -= self._windowMarkStart * self._scale
+        deltaX = (startTimestamp - self._startTimestamp) / self._scale
+        super().pan(startTimestamp)
+        self.move(self._windowMark, deltaX, 0)
+        self._shift_density()
+
+    def _draw_density(self):
+        """Render the section coverage into a single image.
+
+        The whole strip is rendered, starting at the left window edge.
+        """
+        xMax = self.get_window_width()
+        if xMax < 1:
+            return
+
+        if self._densityImage is None:
+            self._densityImage = tk.PhotoImage(
+                master=self,
+                width=xMax,
+                height=self.OV_SC_THICKNESS,
             )
-            xPos += self.majorSpacing
-            timestamp += resolution
-
-        #--- Draw the section marks.
-        for section in srtSections:
-            timestamp, durationSeconds, __, __, __, sectionColor = section
-            xStart = (timestamp - startTimestamp) / scale
-            xEnd = (timestamp - startTimestamp + durationSeconds) / scale
-            if xEnd - xStart < self.OV_SC_X_MIN:
-                xEnd += self.OV_SC_X_MIN
-            self.create_line(
-                xStart,
-                self.OV_SC_Y_POS,
-                xEnd,
-                self.OV_SC_Y_POS,
-                width=self.OV_SC_THICKNESS,
-                fill=sectionColor,
+            self._densityItem = self.create_image(
+                0,
+                self.OV_SC_Y_POS - self.OV_SC_THICKNESS // 2,
+                image=self._densityImage,
+                anchor='nw',
             )
+        elif self._densityImage.width() != xMax:
+            self._densityImage.configure(width=xMax)
+        self._densityStart = self._startTimestamp
+        self._render_density(0, xMax)
+        self.coords(
+            self._densityItem,
+            0,
+            self.OV_SC_Y_POS - self.OV_SC_THICKNESS // 2,
+        )
+
+    def _draw_major_tick(self, items, xPos, timestamp, days, hour, minute):
+        """Draw an overview scale label.
+
+        Reuse items, if not None.
+        Return the list of canvas items.
+        Overrides the superclass method.
+        """
+        if items is None:
+            items = [None]
+        self._draw_text(
+            items,
+            0,
+            xPos + 5,
+            self.OV_DATE_POS,
+            self._get_label(
+                self._majorLabelCache,
+                self._get_major_label,
+                self._units,
+                timestamp,
+                days,
+                hour,
+                minute,
+            ),
+            prefs['color_major_scale'],
+        )
+        return items
+
+    def _draw_minor_scale(self, tsStart, tsEnd, redraw):
+        """The overview has no minor scale.
+
+        Overrides the superclass method.
+        """
+
+    def _get_rgb(self, color):
+        """Return a color name converted to "#rrggbb"."""
+        try:
+            return self._rgbColors[color]
+
+        except KeyError:
+            red, green, blue = self.winfo_rgb(color)
+            rgbColor = f'#{red >> 8:02x}{green >> 8:02x}{blue >> 8:02x}'
+            self._rgbColors[color] = rgbColor
+            return rgbColor
+
+    def _get_major_label(self, days, hour, minute):
+        """Overrides the superclass method."""
+        units = self._units
+        if self._specificDate:
+            year, month, day = civil_from_days(days)
+            if units == 0:
+                weekDay = day_abbr[weekday_from_days(days)]
+                dtStr = f"{weekDay} {hour:02}:{minute:02}"
+            elif units == 1:
+                dtStr = self._tlvCtrl.datestr(date(year, month, day))
+            elif units == 2:
+                dtStr = f"{month_abbr[month]} {year}"
+            elif units == 3:
+                dtStr = f"{year}"
+        else:
+            day = days - self._refDays
+            if units == 0:
+                dtStr = f"{_('Day')} {day} {hour:02}:{minute:02}"
+            else:
+                dtStr = f"{_('Day')} {day}"
+        return dtStr
+
+    def _render_density(self, xFrom, xTo):
+        """Render the pixel columns xFrom to xTo-1 of the density strip.
+
+        Each pixel column shows the color of the latest section 
+        that covers its time range. The cost depends on the number 
+        of columns, because the sections covering a pixel are found 
+        by bisecting the sorted start and end timestamps.
+        Section marks are at least OV_SC_X_MIN pixels wide.
+        """
+        starts = self._sectionIndex.starts
+        ends = self._sectionIndex.ends
+        durations = self._sectionIndex.durations
+        colorIds = self._sectionIndex.colorIds
+        colors = self._sectionIndex.colors
+        markMin = self.OV_SC_X_MIN * self._scale
+        backgroundColor = self._get_rgb(self._background)
+        defaultColor = self._get_rgb(prefs['color_section_mark'])
+        pixels = []
+        iStart = 0
+        iEnd = 0
+        for x in range(xFrom, xTo):
+            t0 = self._densityStart + x * self._scale
+            t1 = t0 + self._scale
+            iStart = bisect_left(starts, t1, iStart)
+            iEnd = bisect_left(ends, t0 - markMin, iEnd)
+            if iStart - iEnd <= 0:
+                # no section is covering the pixel
+                pixels.append(backgroundColor)
+                continue
+
+            k = iStart - 1
+            if starts[k] + durations[k] + markMin >= t0:
+                pixels.append(self._get_rgb(colors[colorIds[k]]))
+            else:
+                pixels.append(defaultColor)
+        row = f'{{{" ".join(pixels)}}}'
+        self._densityImage.put(
+            ' '.join([row] * self.OV_SC_THICKNESS),
+            to=(xFrom, 0),
+        )
+
+    def _shift_density(self):
+        """Move the density strip to the current start timestamp.
 
+        The pixel columns remaining in the window are copied,
+        and only the newly exposed columns are rendered.
+        The strip is shifted by whole pixels; the remaining offset
+        of less than a pixel is applied to its position.
+        """
+        xMax = self.get_window_width()
+        if self._densityImage is None or self._densityImage.width() != xMax:
+            self._draw_density()
+            return
+
+        shift = round(
+            (self._startTimestamp - self._densityStart) / self._scale
+        )
+        if abs(shift) >= xMax:
+            self._draw_density()
+            return
+
+        if shift:
+            if self._spareImage is None:
+                self._spareImage = tk.PhotoImage(
+                    master=self,
+                    width=xMax,
+                    height=self.OV_SC_THICKNESS,
+                )
+            elif self._spareImage.width() != xMax:
+                self._spareImage.configure(width=xMax)
+            if shift > 0:
+                xSource = shift
+                xTarget = 0
+                newColumns = (xMax - shift, xMax)
+            else:
+                xSource = 0
+                xTarget = -shift
+                newColumns = (0, -shift)
+            self._spareImage.tk.call(
+                self._spareImage.name,
+                'copy',
+                self._densityImage.name,
+                '-from',
+                xSource,
+                0,
+                xSource + xMax - abs(shift),
+                self.OV_SC_THICKNESS,
+                '-to',
+                xTarget,
+                0,
+            )
+            self._densityImage, self._spareImage = (
+                self._spareImage,
+                self._densityImage,
+            )
+            self._densityStart += shift * self._scale
+            self._render_density(*newColumns)
+            self.itemconfigure(self._densityItem, image=self._densityImage)
+        self.coords(
+            self._densityItem,
+            (self._densityStart - self._startTimestamp) / self._scale,
+            self.OV_SC_Y_POS - self.OV_SC_THICKNESS // 2,
+        )
@@ -31,6 +31,59 @@ class TlvPublicApi:
         """
         self.view.fit_window()
 
+    def fit_range(self, startTimestamp, endTimestamp):
+        """Show the time range between startTimestamp and endTimestamp.
+        
+        This sets the scale and moves the timeline, 
+        so that the time range fits into the window.
+        """
+        self.view.fit_range(startTimestamp, endTimestamp)
+
+    def get_draw_stats(self):
+        """Return a list of the recent timing samples, oldest first.
+        
+        Samples are recorded for drawing the timeline and
+        for sorting the sections, if the draw_timing option is set.
+        Each sample is a dictionary with the keys:
+        'operation', 'ms', 'items', and 'stages'.
+        'stages' maps the stage names to (ms, items) tuples.
+        """
+        return self.drawStats.get_samples()
+
+    def get_latency_stats(self):
+        """Return a dictionary with the input latency statistics.
+        
+        The latency is measured from an input event
+        to the end of the redraw it causes,
+        if the latency_tracing option is set.
+        See TlvLatencyTracer.get_stats() for the keys.
+        """
+        return self.latencyTracer.get_stats()
+
+    def get_row_count(self):
+        """Return the number of section rows of the most recent drawing.
+        
+        The rows are counted up to the right edge of the window.
+        """
+        return self.view.get_canvas().rowCount
+
+    def get_sections_at(self, timestamp):
+        """Return a list of the IDs of the sections covering timestamp.
+        
+        The sections are sorted by their start.
+        The result refers to the most recent refresh.
+        """
+        return self.sectionIndex.get_sections_at(timestamp)
+
+    def get_sections_in(self, startTimestamp, endTimestamp):
+        """Return a list of the IDs of the sections within a time range.
+        
+        Find all sections intersecting the time range between 
+        startTimestamp and endTimestamp, sorted by their start.
+        The result refers to the most recent refresh.
+        """
+        return self.sectionIndex.get_sections_in(startTimestamp, endTimestamp)
+
     def go_to(self, scId):
         """Show and mark the section identified by scId.
         
@@ -66,7 +119,7 @@ class TlvPublicApi:
     def refresh(self, event=None):
         """Redraw the timeline window."""
         self.view.sort_sections()
-        self.view.draw_timeline()
+        self.view.request_redraw()
 
     def reset_casc(self, event=None):
         """Reset the section cascading to default."""
@@ -4,18 +4,18 @@ Copyright (c) Peter Triesberger
 For further information see https://github.com/peter88213/nv_tlview
 License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 """
-from _datetime import date
 from calendar import day_abbr
 from calendar import month_abbr
+from datetime import date
 
 import tkinter as tk
-from tlv.tlv_globals import DAY
+from tlv.tlv_canvas_batch import TlvCanvasBatch
 from tlv.tlv_globals import HOUR
-from tlv.tlv_globals import MONTH
-from tlv.tlv_globals import YEAR
 from tlv.tlv_globals import prefs
-from tlv.tlv_helper import from_timestamp
-from tlv.tlv_helper import get_unspecific_date
+from tlv.tlv_helper import civil_from_days
+from tlv.tlv_helper import iso_to_days
+from tlv.tlv_helper import weekday_from_days
+from tlv.tlv_layout_engine import TlvLayoutEngine
 from tlv.tlv_locale import _
 
 
@@ -28,11 +28,45 @@ class TlvScaleCanvas(tk.Canvas):
     SCALE_SPACING_MIN = 120
     MINOR_SPACING_MIN = 40
 
+    LABEL_CACHE_MAX = 2000
+    # number of memoized labels per scale
+
     def __init__(self, tlvController, master=None, **kw):
         super().__init__(master, cnf={}, **kw)
         self._tlvCtrl = tlvController
+        self._layout = TlvLayoutEngine()
+        self._batch = TlvCanvasBatch(self)
+        # the scale items are created and updated in a single Tcl call
         self.majorSpacing = None
         self.minorSpacing = None
+        self._majorTicks = {}
+        self._minorTicks = {}
+        # lists of canvas items by scale line timestamp
+        self._majorLabelCache = {}
+        self._minorLabelCache = {}
+        # label strings by (timestamp, units, specificDate)
+
+        # Parameters of the most recent drawing.
+        self._startTimestamp = None
+        self._scale = None
+        self._majorResolution = None
+        self._minorResolution = None
+        self._units = None
+        self._minorUnits = None
+        self._specificDate = None
+        self._refIso = None
+        self._refDays = None
+        self._showWeekDay = None
+        self._drawKey = None
+        # the scale lines are reused, if this is unchanged
+
+        # Time range covered by the scale items.
+        self._tsStart = None
+        self._tsEnd = None
+
+        self._windowWidth = None
+        # cached window width in pixels
+        self.bind('<Configure>', self._on_configure)
 
     def draw(
         self,
@@ -43,166 +77,395 @@ class TlvScaleCanvas(tk.Canvas):
         background,
     ):
         self['background'] = background
-        self.delete("all")
-        if not specificDate:
-            if refIso is None:
-                refIso = '0001-01-01'
-                showWeekDay = False
-            else:
-                showWeekDay = True
-
-        #--- Draw the major scale.
+        self._set_date_mode(specificDate, refIso)
 
-        resolution, self.majorSpacing, units = self._calculate_resolution(
+        # Calculate the major resolution.
+        (
+            majorResolution,
+            self.majorSpacing,
+            units,
+        ) = self._layout.get_resolution(
             scale,
             HOUR,
             self.SCALE_SPACING_MIN
             )
-        xPos, timestamp = self._calculate_first_scale_line(
-            resolution,
-            startTimestamp,
-            scale
+
+        # Calculate the minor resolution.
+        (
+            minorResolution,
+            self.minorSpacing,
+            minorUnits,
+        ) = self._layout.get_minor_resolution(
+            majorResolution,
+            units,
+            scale,
+            self.MINOR_SPACING_MIN,
+        )
+
+        drawKey = (
+            scale,
+            majorResolution,
+            minorResolution,
+            units,
+            specificDate,
+            self._refIso,
+            prefs['color_major_scale'],
+            prefs['color_minor_scale'],
+        )
+        if drawKey == self._drawKey:
+            self.pan(startTimestamp)
+            return
+
+        # Draw the scale lines.
+        self._drawKey = drawKey
+        self._startTimestamp = startTimestamp
+        self._scale = scale
+        self._majorResolution = majorResolution
+        self._minorResolution = minorResolution
+        self._units = units
+        self._minorUnits = minorUnits
+        self._draw_scales(startTimestamp, True)
+
+    def get_window_width(self):
+        """Return the window width in pixels.
+        
+        The width is tracked by <Configure> events. 
+        Only if no width is known yet, the geometry is synchronized.
+        """
+        if self._windowWidth is None:
+            self.update_idletasks()
+            self._windowWidth = self.winfo_width()
+        return self._windowWidth
+
+    def pan(self, startTimestamp):
+        """Shift the scale horizontally without redrawing it.
+
+        Only the scale lines entering or leaving the window 
+        are processed.
+        """
+        deltaX = (startTimestamp - self._startTimestamp) / self._scale
+        self.move('all', -deltaX, 0)
+        self._startTimestamp = startTimestamp
+        self._draw_scales(startTimestamp, False)
+
+    def _draw_line(self, items, i, xPos, yStart, yEnd, color):
+        """Move the i-th item of items to a vertical line.
+        
+        Create the line, if the item is None.
+        The commands are queued in the batch.
+        """
+        if items[i] is not None:
+            self._batch.coords(items[i], xPos, yStart, xPos, yEnd)
+            self._batch.itemconfigure(items[i], fill=color)
+            return
+
+        self._batch.create(
+            items,
+            i,
+            'line',
+            xPos,
+            yStart,
+            xPos,
+            yEnd,
+            width=1,
+            fill=color,
+        )
+
+    def _draw_major_scale(self, tsStart, tsEnd, redraw):
+        """Update the major scale for the time range tsStart..tsEnd."""
+        self._update_ticks(
+            self._majorTicks,
+            self._majorResolution,
+            self._draw_major_tick,
+            tsStart,
+            tsEnd,
+            redraw,
+        )
+
+    def _draw_major_tick(self, items, xPos, timestamp, days, hour, minute):
+        """Draw a major scale line with its label.
+
+        Reuse items, if not None.
+        Return the list of canvas items.
+        """
+        if items is None:
+            items = [None, None]
+        self._draw_line(
+            items,
+            0,
+            xPos,
+            0,
+            self.MAJOR_HEIGHT,
+            prefs['color_major_scale'],
+            )
+        self._draw_text(
+            items,
+            1,
+            xPos + 5,
+            2,
+            self._get_label(
+                self._majorLabelCache,
+                self._get_major_label,
+                self._units,
+                timestamp,
+                days,
+                hour,
+                minute,
+            ),
+            prefs['color_major_scale'],
             )
+        return items
 
-        # Draw the major scale lines.
-        xMax = self.get_window_width()
-        while xPos < xMax:
-            try:
-                dt = from_timestamp(timestamp)
-            except OverflowError:
-                break
-
-            if specificDate:
-                weekDay = day_abbr[dt.weekday()]
-                month = month_abbr[dt.month]
-                if units == 0:
-                    dtStr = f"{weekDay} {self._tlvCtrl.datestr(dt)}"
-                elif units == 1:
-                    dtStr = f"{weekDay} {self._tlvCtrl.datestr(dt)}"
-                elif units == 2:
-                    dtStr = f"{month} {dt.year}"
-                elif units == 3:
-                    dtStr = f"{dt.year}"
-            else:
-                day = get_unspecific_date(date.isoformat(dt), refIso)
-                if showWeekDay:
-                    weekDay = f'{day_abbr[dt.weekday()]} '
-                else:
-                    weekDay = ''
-                if units == 0:
-                    dtStr = f"{weekDay} {_('Day')} {day}"
-                elif units == 1:
-                    dtStr = f"{weekDay} {_('Day')} {day}"
-                elif units == 2:
-                    dtStr = f"{_('Day')} {day}"
-                elif units == 3:
-                    dtStr = f"{_('Day')} {day}"
-
-            self.create_line(
-                (xPos, 0),
-                (xPos, self.MAJOR_HEIGHT),
-                width=1,
-                fill=prefs['color_major_scale'],
-                )
-            self.create_text(
-                (xPos + 5, 2),
-                text=dtStr,
-                fill=prefs['color_major_scale'],
-                anchor='nw',
-                )
-            xPos += self.majorSpacing
-            timestamp += resolution
-
-        #--- Draw the minor scale.
-
-        # Calculate the resolution.
-        resolution /= 4
-        self.minorSpacing = resolution / scale
-        while self.minorSpacing < self.MINOR_SPACING_MIN:
-            resolution *= 2
-            if units == 0 and resolution >= DAY:
-                resolution = DAY
-            elif units == 1 and resolution >= YEAR:
-                resolution = YEAR
-            self.minorSpacing = resolution / scale
-        xPos, timestamp = self._calculate_first_scale_line(
-            resolution,
-            startTimestamp,
-            scale
+    def _draw_minor_scale(self, tsStart, tsEnd, redraw):
+        """Update the minor scale for the time range tsStart..tsEnd."""
+        self._update_ticks(
+            self._minorTicks,
+            self._minorResolution,
+            self._draw_minor_tick,
+            tsStart,
+            tsEnd,
+            redraw,
+        )
+
+    def _draw_minor_tick(self, items, xPos, timestamp, days, hour, minute):
+        """Draw a minor scale line with its label.
+
+        Reuse items, if not None.
+        Return the list of canvas items.
+        """
+        if items is None:
+            items = [None, None]
+        self._draw_line(
+            items,
+            0,
+            xPos,
+            self.MAJOR_HEIGHT,
+            self.CANVAS_HEIGHT,
+            prefs['color_minor_scale'],
             )
+        self._draw_text(
+            items,
+            1,
+            xPos + 5,
+            self.MAJOR_HEIGHT + 1,
+            self._get_label(
+                self._minorLabelCache,
+                self._get_minor_label,
+                self._minorUnits,
+                timestamp,
+                days,
+                hour,
+                minute,
+            ),
+            prefs['color_minor_scale'],
+            )
+        return items
+
+    def _draw_scales(self, startTimestamp, redraw):
+        """Place the scale lines in the window.
+
+        If redraw is False, the scale lines drawn before are
+        assumed to be in place, and only the lines entering
+        or leaving the window are processed.
+        """
+        tsStart = startTimestamp
+        tsEnd = startTimestamp + self.get_window_width() * self._scale
+        self._draw_major_scale(tsStart, tsEnd, redraw)
+        self._draw_minor_scale(tsStart, tsEnd, redraw)
+        self._batch.submit()
+        self._tsStart = tsStart
+        self._tsEnd = tsEnd
+
+    def _draw_text(self, items, i, xPos, yPos, text, color):
+        """Move the i-th item of items, and set its text and color.
+        
+        Create the text, if the item is None.
+        The commands are queued in the batch.
+        """
+        if items[i] is not None:
+            self._batch.coords(items[i], xPos, yPos)
+            self._batch.itemconfigure(items[i], text=text, fill=color)
+            return
+
+        self._batch.create(
+            items,
+            i,
+            'text',
+            xPos,
+            yPos,
+            text=text,
+            fill=color,
+            anchor='nw',
+        )
 
-        # Draw the minor scale lines.
-        while xPos < xMax:
-            try:
-                dt = from_timestamp(timestamp)
-            except OverflowError:
-                break
-
-            if specificDate:
-                weekDay = day_abbr[dt.weekday()]
-                month = month_abbr[dt.month]
-                if units == 0:
-                    dtStr = f"{dt.hour:02}:{dt.minute:02}"
-                elif units == 1:
-                    dtStr = f"{weekDay} {dt.day}"
-                elif units == 2:
-                    dtStr = f"{month}"
-                elif units == 3:
-                    dtStr = f"{dt.year}"
+    def _get_label(
+        self,
+        cache,
+        getLabel,
+        units,
+        timestamp,
+        days,
+        hour,
+        minute,
+    ):
+        """Return the memoized label of a scale line.
+
+        Positional arguments:
+            cache: dict -- Labels by (timestamp, units, specificDate).
+            getLabel -- Function that formats the label.
+            units: int -- Units of the scale.
+        """
+        key = (timestamp, units, self._specificDate)
+        try:
+            return cache[key]
+
+        except KeyError:
+            if len(cache) >= self.LABEL_CACHE_MAX:
+                cache.clear()
+            label = getLabel(days, hour, minute)
+            cache[key] = label
+            return label
+
+    def _get_major_label(self, days, hour, minute):
+        units = self._units
+        if self._specificDate:
+            weekDay = day_abbr[weekday_from_days(days)]
+            year, month, day = civil_from_days(days)
+            if units == 0:
+                dateStr = self._tlvCtrl.datestr(date(year, month, day))
+                dtStr = f"{weekDay} {dateStr}"
+            elif units == 1:
+                dateStr = self._tlvCtrl.datestr(date(year, month, day))
+                dtStr = f"{weekDay} {dateStr}"
+            elif units == 2:
+                dtStr = f"{month_abbr[month]} {year}"
+            elif units == 3:
+                dtStr = f"{year}"
+        else:
+            day = days - self._refDays
+            if self._showWeekDay:
+                weekDay = f'{day_abbr[weekday_from_days(days)]} '
             else:
-                day = get_unspecific_date(date.isoformat(dt), refIso)
-                weekDay = day_abbr[dt.weekday()]
-                if units == 0:
-                    dtStr = f"{dt.hour:02}:{dt.minute:02}"
-                elif units == 1:
-                    dtStr = day
-                elif units == 2:
-                    dtStr = day
-                elif units == 3:
-                    dtStr = day
-
-            self.create_line(
-                (xPos, self.MAJOR_HEIGHT),
-                (xPos, self.CANVAS_HEIGHT),
-                width=1,
-                fill=prefs['color_minor_scale'],
-                )
-            self.create_text(
-                (xPos + 5, self.MAJOR_HEIGHT + 1),
-                text=dtStr,
-                fill=prefs['color_minor_scale'],
-                anchor='nw',
-                )
-            xPos += self.minorSpacing
-            timestamp += resolution
+                weekDay = ''
+            if units == 0:
+                dtStr = f"{weekDay} {_('Day')} {day}"
+            elif units == 1:
+                dtStr = f"{weekDay} {_('Day')} {day}"
+            elif units == 2:
+                dtStr = f"{_('Day')} {day}"
+            elif units == 3:
+                dtStr = f"{_('Day')} {day}"
+        return dtStr
 
-    def get_window_width(self):
-        self.update()
-        return self.winfo_width()
-        # in pixels
-
-    def _calculate_first_scale_line(self, resolution, startTimestamp, scale):
-        tsOffset = resolution - startTimestamp % resolution
-        if tsOffset == resolution:
-            tsOffset = 0
-        xPos = tsOffset / scale
-        timestamp = startTimestamp + tsOffset
-        return xPos, timestamp
-
-    def _calculate_resolution(self, scale, resolution, spacingMin):
-        spacing = resolution / scale
-        units = 0
-        while spacing < spacingMin:
-            resolution *= 2
-            if units == 0 and resolution >= DAY:
-                resolution = DAY
-                units = 1
-            elif units == 1 and resolution >= MONTH:
-                resolution = MONTH
-                units = 2
-            elif units == 2 and resolution >= YEAR:
-                resolution = YEAR
-                units = 3
-            spacing = resolution / scale
-        return resolution, spacing, units
+    def _get_minor_label(self, days, hour, minute):
+        units = self._minorUnits
+        if self._specificDate:
+            year, month, day = civil_from_days(days)
+            if units == 0:
+                dtStr = f"{hour:02}:{minute:02}"
+            elif units == 1:
+                dtStr = f"{day_abbr[weekday_from_days(days)]} {day}"
+            elif units == 2:
+                dtStr = f"{month_abbr[month]}"
+            elif units == 3:
+                dtStr = f"{year}"
+        else:
+            day = str(days - self._refDays)
+            if units == 0:
+                dtStr = f"{hour:02}:{minute:02}"
+            elif units == 1:
+                dtStr = day
+            elif units == 2:
+                dtStr = day
+            elif units == 3:
+                dtStr = day
+        return dtStr
+
+    def _on_configure(self, event):
+        self._windowWidth = event.width
+
+    def _set_date_mode(self, specificDate, refIso):
+        self._specificDate = specificDate
+        self._showWeekDay = True
+        if not specificDate:
+            if refIso is None:
+                refIso = '0001-01-01'
+                self._showWeekDay = False
+        if refIso != self._refIso:
+            self._majorLabelCache.clear()
+            self._minorLabelCache.clear()
+            # the unspecific day labels refer to refIso
+        self._refIso = refIso
+        if not specificDate:
+            self._refDays = iso_to_days(refIso)
 
+    def _update_ticks(
+        self,
+        ticks,
+        resolution,
+        drawTick,
+        tsStart,
+        tsEnd,
+        redraw,
+    ):
+        """Update the scale lines of one scale.
+
+        Positional arguments:
+            ticks: dict -- Lists of canvas items by timestamp.
+            resolution: int -- Seconds between the scale lines.
+                               If None, the scale is removed.
+            drawTick -- Function that draws a scale line.
+            tsStart, tsEnd: int -- Time range of the window.
+            redraw: Boolean -- If True, draw all scale lines anew.
+
+        The canvas items of the scale lines leaving the time range
+        are reused for the scale lines entering it.
+        """
+        calendar = self._specificDate and self._units >= 2
+        # months and years are aligned with the calendar
+        spareItems = []
+        if resolution is None:
+            spareItems.extend(ticks.values())
+            ticks.clear()
+            newRanges = []
+        elif redraw:
+            spareItems.extend(ticks.values())
+            ticks.clear()
+            newRanges = [(tsStart, tsEnd)]
+        else:
+            for timestamp in list(ticks):
+                if not tsStart <= timestamp < tsEnd:
+                    spareItems.append(ticks.pop(timestamp))
+            newRanges = []
+            if tsStart < self._tsStart:
+                newRanges.append((tsStart, min(self._tsStart, tsEnd)))
+            if tsEnd > self._tsEnd:
+                newRanges.append((max(self._tsEnd, tsStart), tsEnd))
+        for tsFrom, tsTo in newRanges:
+            for xPos, timestamp, days, hour, minute in (
+                self._layout.get_scale_lines(
+                    resolution,
+                    tsFrom,
+                    tsTo,
+                    self._startTimestamp,
+                    self._scale,
+                    calendar=calendar,
+                )
+            ):
+                if spareItems:
+                    items = spareItems.pop()
+                else:
+                    items = None
+                ticks[timestamp] = drawTick(
+                    items,
+                    xPos,
+                    timestamp,
+                    days,
+                    hour,
+                    minute,
+                )
+        unusedItems = []
+        for items in spareItems:
+            unusedItems.extend(items)
+        if unusedItems:
+            self.delete(*unusedItems)
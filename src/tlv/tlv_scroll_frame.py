@@ -9,6 +9,7 @@ from tkinter import ttk
 from tlv.platform.platform_settings import MOUSE
 from tlv.platform.platform_settings import PLATFORM
 from tlv.tlv_globals import prefs
+from tlv.tlv_locale import _
 from tlv.tlv_overview_canvas import TlvOverviewCanvas
 from tlv.tlv_scale_canvas import TlvScaleCanvas
 from tlv.tlv_section_canvas import TlvSectionCanvas
@@ -19,6 +20,10 @@ class TlvScrollFrame(ttk.Frame):
     def __init__(self, parent, tlvController, *args, **kw):
 
         ttk.Frame.__init__(self, parent, *args, **kw)
+        self._drawStats = tlvController.drawStats
+        self._statsLabel = None
+        # optional overlay showing the draw timing
+        self._loadingLabel = None
 
         # Scrollbar.
         scrollY = ttk.Scrollbar(self, orient='vertical', command=self.yview)
@@ -107,11 +112,14 @@ class TlvScrollFrame(ttk.Frame):
             self,
             startTimestamp,
             scale,
-            srtSections,
+            sectionIndex,
             minDist,
             specificDate,
             referenceDate
     ):
+        isTimed = prefs.get('draw_timing', False)
+        if isTimed:
+            self._drawStats.begin('draw_timeline')
         self._scaleCanvas.draw(
             startTimestamp,
             scale,
@@ -119,21 +127,42 @@ class TlvScrollFrame(ttk.Frame):
             referenceDate,
             prefs['color_scale_background'],
         )
+        if isTimed:
+            self._drawStats.end_stage(
+                'scale',
+                len(self._scaleCanvas.find_all()),
+            )
         self._sectionCanvas.draw(
             startTimestamp,
             scale,
-            srtSections,
+            sectionIndex,
             minDist,
             prefs['color_section_background'],
         )
+        if isTimed:
+            self._drawStats.end_stage(
+                'sections',
+                len(self._sectionCanvas.find_all()),
+            )
         self._ovCanvas.draw(
             startTimestamp,
             scale,
             specificDate,
             referenceDate,
-            srtSections,
+            sectionIndex,
             prefs['color_scale_background'],
         )
+        if isTimed:
+            self._drawStats.end_stage(
+                'overview',
+                len(self._ovCanvas.find_all()),
+            )
+            self._drawStats.commit()
+        if isTimed and prefs.get('draw_timing_overlay', False):
+            self._show_draw_stats()
+        elif self._statsLabel is not None:
+            self._statsLabel.destroy()
+            self._statsLabel = None
 
     def get_canvas(self):
         return self._sectionCanvas
@@ -156,12 +185,36 @@ class TlvScrollFrame(ttk.Frame):
             elif event.num == 5:
                 self.yview_scroll(1, 'units')
 
+    def pan_timeline(self, startTimestamp, scale, sectionIndex, minDist):
+        """Shift the timeline horizontally by moving the existing items."""
+        self._scaleCanvas.pan(startTimestamp)
+        self._sectionCanvas.pan(
+            startTimestamp,
+            scale,
+            sectionIndex,
+            minDist,
+        )
+        self._ovCanvas.pan(startTimestamp)
+
     def set_drag_scrolling(self):
         self._sectionCanvas.configure(yscrollincrement=1)
 
     def set_normal_scrolling(self):
         self._sectionCanvas.configure(yscrollincrement=self._yscrollincrement)
 
+    def show_loading(self, isLoading):
+        """Show or hide a notice that the sections are being loaded."""
+        if isLoading:
+            if self._loadingLabel is None:
+                self._loadingLabel = ttk.Label(
+                    self._sectionCanvas,
+                    text=_('Loading sections...'),
+                )
+                self._loadingLabel.place(relx=0.5, rely=0.5, anchor='center')
+        elif self._loadingLabel is not None:
+            self._loadingLabel.destroy()
+            self._loadingLabel = None
+
     def xview(self, *args):
         self._sectionCanvas.xview(*args)
 
@@ -174,3 +227,19 @@ class TlvScrollFrame(ttk.Frame):
 
         self._sectionCanvas.yview_scroll(*args)
 
+    def _show_draw_stats(self):
+        """Display the timing of the most recent drawing."""
+        sample = self._drawStats.get_last('draw_timeline')
+        p95 = self._drawStats.get_percentile('draw_timeline', 95)
+        if self._statsLabel is None:
+            self._statsLabel = ttk.Label(self._sectionCanvas)
+            self._statsLabel.place(relx=1.0, x=-5, y=5, anchor='ne')
+        self._statsLabel.configure(
+            text=(
+                f'{sample["ms"]:.1f} ms | '
+                f'p95 {p95:.1f} ms | '
+                f'{sample["items"]} items'
+            ),
+            background=prefs['color_scale_background'],
+            foreground=prefs['color_indicator'],
+        )
@@ -5,20 +5,35 @@ For further information see https://github.com/peter88213/nv_tlview
 License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
 """
 
+from time import perf_counter
 import tkinter as tk
+from tkinter import font as tkFont
+from tlv.tlv_canvas_batch import TlvCanvasBatch
 from tlv.tlv_globals import prefs
+from tlv.tlv_layout_engine import TlvLayoutEngine
 from tlv.tlv_locale import _
 
 
 class TlvSectionCanvas(tk.Canvas):
 
     # Constants in pixels.
-    SC_EVENT_DIST_Y = 35
-    # vertical distance between section marks
-    SC_LABEL_DIST_X = 10
-    # horizontal distance between section mark and label
-    SC_MARK_HALF = 5
-    # half of the section marker's height
+    SC_EVENT_DIST_Y = TlvLayoutEngine.SC_EVENT_DIST_Y
+    SC_LABEL_DIST_X = TlvLayoutEngine.SC_LABEL_DIST_X
+    SC_MARK_HALF = TlvLayoutEngine.SC_MARK_HALF
+
+    SECTION_TAG = 'section'
+    # tag of all section marks
+    CLUSTER_TAG = 'cluster'
+    # tag of all cluster marks
+
+    TEXT_WIDTH_CACHE_MAX = 50000
+    # maximum number of cached label widths
+    LABEL_TIME_BUDGET = 8
+    # default milliseconds per chunk of label creation
+    LABEL_CHUNK_MIN = 50
+    # number of sections in the first chunk of label creation
+    LABEL_CHUNK_DELAY = 1
+    # milliseconds between the chunks, for processing pending events
 
     isLocked = False
     # class variable to be changed from the parent view component
@@ -27,6 +42,34 @@ class TlvSectionCanvas(tk.Canvas):
         super().__init__(master, cnf={}, **kw)
         self._tlvCtrl = tlvController
         self.yMax = 0
+        self.rowCount = 0
+        # number of rows needed up to the right edge of the window
+        self._font = tkFont.nametofont('TkDefaultFont')
+        # the default font of the canvas text items
+        self._textWidths = {}
+        # cache for the label widths
+        self._layout = TlvLayoutEngine(self._get_text_width)
+        self._sectionItems = {}
+        # key: section ID, value: [mark, title, date, content]
+        # content is (color, title, timeStr, title color, date color)
+        # title and date are None, if the labels are not created yet
+        self._batch = TlvCanvasBatch(self)
+        # the section items are created and updated in a single Tcl call
+        self._newMarks = []
+        # (items, sectionId, clusterRange) of the marks being created
+        self._pendingLabels = []
+        # (sectionId, xLabel, yPos, xShift) tuples of the sections
+        # waiting for their labels, in reverse order
+        self._labelsPerChunk = self.LABEL_CHUNK_MIN
+        # adapted to the label time budget
+        self._xShift = 0
+        # sum of the horizontal item movements by panning
+        self._labelJobId = None
+        # ID of the scheduled label creation, if any
+        self._dateOffset = 0
+        # vertical distance between title and date/time
+        self._startTimestamp = None
+        # start of the most recent drawing
 
         # Variables for mouse drag operations.
         self._xPos = None
@@ -35,8 +78,33 @@ class TlvSectionCanvas(tk.Canvas):
         self._indicator = None
         self._indicatorText = None
 
+        self._markSections = {}
+        # key: section mark item ID, value: section ID
+        self._markClusters = {}
+        # key: cluster mark item ID, value: (start, end)
+
         # Bind events.
         self.bind_all('<Escape>', self._on_escape)
+        self.tag_bind(
+            self.SECTION_TAG,
+            '<Double-Button-1>',
+            self._on_double_click,
+        )
+        self.tag_bind(
+            self.SECTION_TAG,
+            '<Shift-Button-1>',
+            self._on_shift_click,
+        )
+        self.tag_bind(
+            self.SECTION_TAG,
+            '<Control-Shift-Button-1>',
+            self._on_ctrl_shift_click,
+        )
+        self.tag_bind(
+            self.CLUSTER_TAG,
+            '<Double-Button-1>',
+            self._on_cluster_double_click,
+        )
 
     def delete_indicator(self):
         self.delete(self._indicator)
@@ -45,87 +113,52 @@ class TlvSectionCanvas(tk.Canvas):
     def draw(
         self,
         startTimestamp,
-        scale, srtSections,
+        scale,
+        sectionIndex,
         minDist,
         background,
     ):
         self['background'] = background
-        self.delete("all")
-        self.yMax = (len(srtSections) + 2) * self.SC_EVENT_DIST_Y
-        yStart = self.SC_EVENT_DIST_Y
-        xEnd = 0
-        yPos = yStart
-        labelEnd = 0
-        for section in srtSections:
-            (
-                timestamp,
-                durationSeconds,
+        self.delete_indicator()
+        self._cancel_labels()
+        self._startTimestamp = startTimestamp
+        self._dateOffset = self._font.metrics('linespace') // 2
+        visibleItems = {}
+        records, self.rowCount = self._layout.arrange_sections(
+            sectionIndex,
+            startTimestamp,
+            scale,
+            minDist,
+            self.winfo_width(),
+            packed=prefs.get('packed_cascading', False),
+        )
+        self.yMax = (self.rowCount + 2) * self.SC_EVENT_DIST_Y
+        for section, clusterRange, xStart, xEnd, yPos in records:
+            __, __, title, timeStr, sectionId, sectionColor = section
+            visibleItems[sectionId] = self._draw_section(
+                sectionId,
+                xStart,
+                xEnd,
+                yPos,
                 title,
                 timeStr,
-                sectionId,
                 sectionColor,
-            ) = section
-            xStart = (timestamp - startTimestamp) / scale
-
-            # Cascade sections.
-            if xStart > labelEnd + minDist:
-                yPos = yStart
-                labelEnd = 0
-
-            # Draw section mark.
-            xEnd = (timestamp - startTimestamp + durationSeconds) / scale
-            sectionMark = self.create_polygon(
-                (xStart, yPos - self.SC_MARK_HALF),
-                (xStart - self.SC_MARK_HALF, yPos),
-                (xStart, yPos + self.SC_MARK_HALF),
-                (xEnd, yPos + self.SC_MARK_HALF),
-                (xEnd + self.SC_MARK_HALF, yPos),
-                (xEnd, yPos - self.SC_MARK_HALF),
-                fill=sectionColor,
-                tags=sectionId,
-            )
-            self.tag_bind(
-                sectionMark,
-                '<Double-Button-1>',
-                self._on_double_click,
-            )
-            self.tag_bind(
-                sectionMark,
-                '<Shift-Button-1>',
-                self._on_shift_click,
-            )
-            self.tag_bind(
-                sectionMark,
-                '<Control-Shift-Button-1>',
-                self._on_ctrl_shift_click,
+                clusterRange,
             )
+        self._batch.submit()
+        self._register_marks()
 
-            # Draw title and date/time.
-            xLabel = xEnd + self.SC_LABEL_DIST_X
-            titleLabel = self.create_text(
-                (xLabel, yPos),
-                text=title,
-                fill=prefs['color_section_title'],
-                anchor='w',
-            )
-            titleBounds = self.bbox(titleLabel)
-            # returns a tuple like (x1, y1, x2, y2)
-            if titleBounds is not None:
-                # this is a workaround because bbox()
-                # sometimes returns None for no known reason
-                self.create_text(
-                    xLabel,
-                    titleBounds[3],
-                    text=timeStr,
-                    fill=prefs['color_section_date'],
-                    anchor='nw'
-                )
-                __, __, x2, __ = self.bbox('all')
-                labelEnd = x2
-            yPos += self.SC_EVENT_DIST_Y
-        totalBounds = self.bbox('all')
-        if totalBounds is not None:
-            self.configure(scrollregion=(0, 0, 0, totalBounds[3]))
+        # Delete the items of the sections that are no longer visible.
+        for sectionId, items in self._sectionItems.items():
+            if sectionId not in visibleItems:
+                self.delete(*[item for item in items[:3] if item is not None])
+                self._markSections.pop(items[0], None)
+                self._markClusters.pop(items[0], None)
+        self._sectionItems = visibleItems
+
+        # Create the missing labels, starting from the left.
+        self._pendingLabels.reverse()
+        self._draw_labels()
 
     def draw_indicator(self, xPos, text=''):
         self.delete_indicator()
@@ -143,8 +176,238 @@ class TlvSectionCanvas(tk.Canvas):
             fill=prefs['color_indicator'],
         )
 
+    def pan(self, startTimestamp, scale, sectionIndex, minDist):
+        """Shift the sections horizontally without redrawing them.
+
+        Only the sections entering the window are created.
+        """
+        deltaX = (startTimestamp - self._startTimestamp) / scale
+        self.move('all', -deltaX, 0)
+        self._xShift -= deltaX
+        self._startTimestamp = startTimestamp
+        records, rowCount = self._layout.arrange_sections(
+            sectionIndex,
+            startTimestamp,
+            scale,
+            minDist,
+            self.winfo_width(),
+            packed=prefs.get('packed_cascading', False),
+        )
+        if rowCount > self.rowCount:
+            self.rowCount = rowCount
+            self.yMax = (self.rowCount + 2) * self.SC_EVENT_DIST_Y
+        for section, clusterRange, xStart, xEnd, yPos in records:
+            __, __, title, timeStr, sectionId, sectionColor = section
+            if sectionId in self._sectionItems:
+                continue
+
+            self._sectionItems[sectionId] = self._draw_section(
+                sectionId,
+                xStart,
+                xEnd,
+                yPos,
+                title,
+                timeStr,
+                sectionColor,
+                clusterRange,
+            )
+        self._batch.submit()
+        self._register_marks()
+        if self._labelJobId is None:
+            self._draw_labels()
+
+    def destroy(self):
+        self._cancel_labels()
+        super().destroy()
+
     def get_section_id(self, event):
-        return event.widget.itemcget('current', 'tag').split(' ')[0]
+        """Return the ID of the section whose mark is under the mouse."""
+        currentItems = self.find_withtag('current')
+        if not currentItems:
+            return None
+
+        return self._markSections.get(currentItems[0], None)
+
+    def _cancel_labels(self):
+        """Stop the label creation in progress."""
+        if self._labelJobId is not None:
+            self.after_cancel(self._labelJobId)
+            self._labelJobId = None
+        self._pendingLabels = []
+
+    def _draw_labels(self):
+        """Create a chunk of pending labels.
+
+        The chunk size is adapted, so that a chunk takes about
+        the time budget. If labels are left, schedule the next chunk,
+        so that Tk can process the pending events in between.
+        """
+        self._labelJobId = None
+        startTime = perf_counter()
+        count = 0
+        while self._pendingLabels and count < self._labelsPerChunk:
+            sectionId, xLabel, yPos, xShift = self._pendingLabels.pop()
+            items = self._sectionItems.get(sectionId, None)
+            if items is None or items[1] is not None:
+                # The section is gone, or already has its labels.
+                continue
+
+            xLabel += self._xShift - xShift
+            # the section might have been moved by panning in the meantime
+            __, title, timeStr, titleColor, dateColor = items[3]
+            self._batch.create(
+                items,
+                1,
+                'text',
+                xLabel,
+                yPos,
+                text=title,
+                fill=titleColor,
+                anchor='w',
+            )
+            self._batch.create(
+                items,
+                2,
+                'text',
+                xLabel,
+                yPos + self._dateOffset,
+                text=timeStr,
+                fill=dateColor,
+                anchor='nw'
+            )
+            count += 1
+        self._batch.submit()
+        if count:
+            budget = prefs.get(
+                'label_time_budget',
+                self.LABEL_TIME_BUDGET
+            ) / 1000
+            elapsed = max(perf_counter() - startTime, 1e-6)
+            self._labelsPerChunk = max(int(count * budget / elapsed), 1)
+
+        if self._pendingLabels:
+            self._labelJobId = self.after(
+                self.LABEL_CHUNK_DELAY,
+                self._draw_labels,
+            )
+            return
+
+        totalBounds = self.bbox('all')
+        if totalBounds is not None:
+            self.configure(scrollregion=(0, 0, 0, totalBounds[3]))
+
+    def _draw_section(
+        self,
+        sectionId,
+        xStart,
+        xEnd,
+        yPos,
+        title,
+        timeStr,
+        sectionColor,
+        clusterRange,
+    ):
+        """Create or update the canvas items of a section or cluster.
+        
+        clusterRange is a (start, end) tuple for clusters, 
+        and None for single sections.
+        The commands are queued in the batch.
+        New labels are not created here, but queued for _draw_labels().
+        Return a list: [mark, title, date, content]
+        The content tuple includes the label colors, so the items
+        are reconfigured when the preferred colors have changed.
+        The mark is None until the batch is submitted.
+        """
+        markCoords = (
+            xStart, yPos - self.SC_MARK_HALF,
+            xStart - self.SC_MARK_HALF, yPos,
+            xStart, yPos + self.SC_MARK_HALF,
+            xEnd, yPos + self.SC_MARK_HALF,
+            xEnd + self.SC_MARK_HALF, yPos,
+            xEnd, yPos - self.SC_MARK_HALF,
+        )
+        xLabel = xEnd + self.SC_LABEL_DIST_X
+        titleColor = prefs['color_section_title']
+        dateColor = prefs['color_section_date']
+        content = (sectionColor, title, timeStr, titleColor, dateColor)
+        items = self._sectionItems.get(sectionId, None)
+        if items is not None:
+            sectionMark, titleLabel, dateLabel, oldContent = items
+            self._batch.coords(sectionMark, *markCoords)
+            if content != oldContent:
+                if clusterRange is None:
+                    self._batch.itemconfigure(sectionMark, fill=sectionColor)
+                else:
+                    self._batch.itemconfigure(
+                        sectionMark,
+                        fill=sectionColor,
+                        outline=titleColor,
+                    )
+                items[3] = content
+            if titleLabel is None:
+                self._pendingLabels.append(
+                    (sectionId, xLabel, yPos, self._xShift)
+                )
+            else:
+                self._batch.coords(titleLabel, xLabel, yPos)
+                self._batch.coords(
+                    dateLabel,
+                    xLabel,
+                    yPos + self._dateOffset,
+                )
+                if content != oldContent:
+                    self._batch.itemconfigure(
+                        titleLabel,
+                        text=title,
+                        fill=titleColor,
+                    )
+                    self._batch.itemconfigure(
+                        dateLabel,
+                        text=timeStr,
+                        fill=dateColor,
+                    )
+            if clusterRange is not None:
+                self._markClusters[sectionMark] = clusterRange
+            return items
+
+        items = [None, None, None, content]
+        if clusterRange is None:
+            self._batch.create(
+                items,
+                0,
+                'polygon',
+                *markCoords,
+                fill=sectionColor,
+                tags=(sectionId, self.SECTION_TAG),
+            )
+        else:
+            self._batch.create(
+                items,
+                0,
+                'polygon',
+                *markCoords,
+                fill=sectionColor,
+                outline=titleColor,
+                tags=(sectionId, self.CLUSTER_TAG),
+            )
+        self._newMarks.append((items, sectionId, clusterRange))
+        self._pendingLabels.append((sectionId, xLabel, yPos, self._xShift))
+        return items
+
+    def _get_text_width(self, text):
+        """Return the width of a text item in pixels.
+        
+        The widths are cached, because measuring is expensive.
+        """
+        try:
+            return self._textWidths[text]
+
+        except KeyError:
+            if len(self._textWidths) > self.TEXT_WIDTH_CACHE_MAX:
+                self._textWidths.clear()
+            width = self._font.measure(text)
+            self._textWidths[text] = width
+            return width
 
     def _move_indicator(self, deltaX):
         self.move(self._indicator, deltaX, 0)
@@ -191,6 +454,16 @@ class TlvSectionCanvas(tk.Canvas):
         self._active_object = None
         self.delete_indicator()
 
+    def _on_cluster_double_click(self, event):
+        # Expand the cluster by zooming into its time range.
+        currentItems = self.find_withtag('current')
+        if not currentItems:
+            return
+
+        clusterRange = self._markClusters.get(currentItems[0], None)
+        if clusterRange is not None:
+            self._tlvCtrl.fit_range(*clusterRange)
+
     def _on_double_click(self, event):
         self.event_generate('<<double-click>>', when='tail')
 
@@ -246,3 +519,11 @@ class TlvSectionCanvas(tk.Canvas):
         self._active_object = None
         self.delete_indicator()
 
+    def _register_marks(self):
+        """Map the marks created by the batch to their sections."""
+        for items, sectionId, clusterRange in self._newMarks:
+            if clusterRange is None:
+                self._markSections[items[0]] = sectionId
+            else:
+                self._markClusters[items[0]] = clusterRange
+        self._newMarks = []
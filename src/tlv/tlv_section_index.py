@@ -0,0 +1,547 @@
+"""Provide a persistent timeline index of the sections.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from calendar import day_abbr
+from datetime import date
+
+from tlv.tlv_cluster_level import TlvClusterLevel
+from tlv.tlv_globals import prefs
+from tlv.tlv_helper import civil_from_days
+from tlv.tlv_helper import clear_parse_cache
+from tlv.tlv_helper import get_duration_str
+from tlv.tlv_helper import get_seconds
+from tlv.tlv_helper import parse_date_time
+from tlv.tlv_helper import parse_day_time
+from tlv.tlv_helper import weekday_from_days
+from tlv.tlv_interval_tree import TlvIntervalTree
+from tlv.tlv_locale import _
+
+
+class TlvSectionIndex:
+    """Timeline index of the sections, keyed by section ID.
+
+    On update, only the sections whose timeline-relevant fields
+    have changed are recomputed. The sorted order is maintained
+    by bisect insertion and removal.
+
+    The sorted sections are stored column by column.
+    Timestamps and durations are kept in integer arrays, 
+    colors are interned in a table, and the date/time labels 
+    are formatted on first access.
+
+    Public instance variables:
+        starts: array of the section timestamps, sorted.
+        durations: array of the section durations in seconds.
+        titles: list of the section titles.
+        scIds: list of the section IDs.
+        colorIds: array of indices into the colors table.
+        colors: list of the section colors.
+                The first entry is the default color, which is
+                taken from the preferences on each update.
+        ends: sorted list of the section end timestamps.
+        specificDate: Boolean -- True, if at least one section has a date.
+        clusterRanges: dict -- Empty, because the index has no clusters.
+        changeCount: int -- Incremented whenever the sorted sections change.
+    """
+    CLUSTER_GAP_MIN = 60
+    # maximum gap in seconds between clustered sections at the lowest level
+    BULK_UPDATE_MIN = 64
+    # number of changed sections from which the columns are rebuilt at once
+    DEFAULT_COLOR_ID = 0
+    # color ID of the sections without a color of their own
+    CANCEL_CHECK_STEP = 1000
+    # number of sections parsed between the checks for cancellation
+
+    def __init__(self, model, tlvController):
+        self._dataModel = model
+        self._tlvCtrl = tlvController
+        self.starts = array('q')
+        self.durations = array('q')
+        self.titles = []
+        self.scIds = []
+        self.colorIds = array('L')
+        self.colors = [None]
+        self.specificDate = False
+        self.clusterRanges = {}
+        self.changeCount = 0
+
+        self._colorIds = {}
+        # key: color, value: index into the colors table
+        self._labels = []
+        # formatted date/time labels; None, if not formatted yet
+        self._records = {}
+        # key: section ID, value: (signature, sort key, isSpecific)
+        self._specificCount = 0
+        self._rebuildKey = None
+        # (reference date, substitute_missing_time) of the snapshot
+        self._maxDuration = 0
+        # None, if it must be recalculated
+        self._clusterLevels = []
+        # levels of detail, built on demand
+        self._ends = None
+        # sorted end timestamps, built on demand
+        self._intervalTree = None
+        # for time range queries, built on demand
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def maxDuration(self):
+        """Return the duration of the longest section in seconds."""
+        if self._maxDuration is None:
+            self._maxDuration = max(self.durations, default=0)
+        return self._maxDuration
+
+    @property
+    def ends(self):
+        """Return a sorted list of the section end timestamps."""
+        if self._ends is None:
+            self._ends = sorted(
+                start + duration
+                for start, duration in zip(self.starts, self.durations)
+            )
+        return self._ends
+
+    def get_lod(self, maxGap):
+        """Return the sections at a level of detail.
+
+        Consecutive sections are merged into clusters,
+        if their start timestamps are less than maxGap seconds apart.
+        The cluster levels form a hierarchy with maxGap doubling
+        from level to level. They are kept until the index changes.
+        Return the index itself, if no sections are to be merged.
+        """
+        if maxGap < self.CLUSTER_GAP_MIN or len(self.starts) < 2:
+            return self
+
+        levelGap = self.CLUSTER_GAP_MIN
+        level = 0
+        while levelGap * 2 <= maxGap:
+            levelGap *= 2
+            level += 1
+        while len(self._clusterLevels) <= level:
+            if self._clusterLevels:
+                lowerLevel = self._clusterLevels[-1]
+                if len(lowerLevel) == 1:
+                    # All sections are merged into one cluster.
+                    return lowerLevel
+
+                self._clusterLevels.append(
+                    TlvClusterLevel(self, lowerLevel.maxGap * 2, lowerLevel)
+                )
+            else:
+                self._clusterLevels.append(
+                    TlvClusterLevel(self, self.CLUSTER_GAP_MIN)
+                )
+        return self._clusterLevels[level]
+
+    def get_range(self, startTimestamp, endTimestamp):
+        """Return a tuple (lo, hi) of row indices.
+
+        All sections intersecting the time range between 
+        startTimestamp and endTimestamp are within the rows lo to hi-1. 
+        The rows may also contain sections that end before startTimestamp.
+        """
+        lo = bisect_left(self.starts, startTimestamp - self.maxDuration)
+        hi = bisect_right(self.starts, endTimestamp, lo)
+        return lo, hi
+
+    def get_section(self, i):
+        """Return the i-th section as a tuple: 
+
+        (timestamp, duration, title, timeStr, scId, color)
+        """
+        return (
+            self.starts[i],
+            self.durations[i],
+            self.titles[i],
+            self.get_time_str(i),
+            self.scIds[i],
+            self.colors[self.colorIds[i]],
+        )
+
+    def get_sections_at(self, timestamp):
+        """Return a list of the IDs of the sections covering timestamp.
+
+        The sections are sorted by their start.
+        """
+        return self.get_sections_in(timestamp, timestamp)
+
+    def get_sections_in(self, startTimestamp, endTimestamp):
+        """Return a list of the IDs of the sections within a time range.
+
+        Find all sections intersecting the time range between 
+        startTimestamp and endTimestamp, sorted by their start.
+        """
+        if self._intervalTree is None:
+            self._intervalTree = TlvIntervalTree([
+                start + duration
+                for start, duration in zip(self.starts, self.durations)
+            ])
+        lo = bisect_right(self.starts, startTimestamp)
+        rows = sorted(self._intervalTree.query(lo, startTimestamp))
+        # sections starting before the time range
+        hi = bisect_right(self.starts, endTimestamp, lo)
+        rows.extend(range(lo, hi))
+        # sections starting within the time range
+        return [self.scIds[i] for i in rows]
+
+    def get_time_str(self, i):
+        """Return the date/time label of the i-th section.
+        
+        The label is formatted on first access.
+        """
+        timeStr = self._labels[i]
+        if timeStr is None:
+            timeStr = self._make_label(i)
+            self._labels[i] = timeStr
+        return timeStr
+
+    def get_title(self, i):
+        """Return the title of the i-th section."""
+        return self.titles[i]
+
+    def get_snapshot(self):
+        """Return a copy of the timeline-relevant model data.
+
+        The snapshot is a tuple: (rebuildKey, defaultColor, signatures)
+        where signatures is a list of (scId, signature) tuples.
+        Taking the snapshot must be done on the Tk thread.
+        The snapshot can then be applied by update() on a worker thread.
+        """
+        rebuildKey = (
+            self._dataModel.referenceDate,
+            prefs.get('substitute_missing_time', False),
+        )
+        sections = self._dataModel.sections
+        signatures = []
+        for scId in sections:
+            section = sections[scId]
+            signatures.append((
+                scId,
+                (
+                    section.scType,
+                    section.date,
+                    section.time,
+                    section.day,
+                    section.lastsDays,
+                    section.lastsHours,
+                    section.lastsMinutes,
+                    section.title,
+                    section.color,
+                ),
+            ))
+        return rebuildKey, prefs['color_section_mark'], signatures
+
+    def update(self, snapshot=None, cancelEvent=None):
+        """Synchronize the index with the data model.
+
+        Optional arguments:
+            snapshot -- Model data returned by get_snapshot().
+                        If None, take a snapshot of the current data.
+            cancelEvent: threading.Event -- If set during the update,
+                         stop early. The index is then incomplete,
+                         and must be discarded.
+
+        Rebuild the whole index, if the reference date or
+        the "substitute_missing_time" preference have changed.
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        rebuildKey, defaultColor, signatures = snapshot
+        self.colors[self.DEFAULT_COLOR_ID] = defaultColor
+        # the sections without a color follow the preferences
+        if rebuildKey != self._rebuildKey:
+            if self._rebuildKey is not None:
+                if rebuildKey[0] != self._rebuildKey[0]:
+                    clear_parse_cache()
+                    # the cached day conversions are outdated
+            self._rebuildKey = rebuildKey
+            self._clear()
+
+        outdatedIds = []
+        newSections = []
+        scIds = set(scId for scId, __ in signatures)
+        for scId in self._records:
+            if scId not in scIds:
+                outdatedIds.append(scId)
+        for scId, signature in signatures:
+            record = self._records.get(scId, None)
+            if record is not None:
+                if record[0] == signature:
+                    continue
+
+                outdatedIds.append(scId)
+            newSections.append((scId, signature))
+        self._remove_sections(outdatedIds)
+        self._insert_sections(newSections, cancelEvent)
+        self.specificDate = self._specificCount > 0
+
+    def _clear(self):
+        self.starts = array('q')
+        self.durations = array('q')
+        self.titles = []
+        self.scIds = []
+        self.colorIds = array('L')
+        self._labels = []
+        self._records = {}
+        self._specificCount = 0
+        self._maxDuration = 0
+        self._clusterLevels = []
+        self.changeCount += 1
+        self._ends = None
+        self._intervalTree = None
+
+    def _find(self, key):
+        """Return the row index where the sort key belongs."""
+        lo = 0
+        hi = len(self.starts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            midKey = (
+                self.starts[mid],
+                self.durations[mid],
+                self.titles[mid] or '',
+                self.scIds[mid],
+            )
+            if midKey < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _get_color_id(self, color):
+        """Return the index of color in the colors table."""
+        try:
+            return self._colorIds[color]
+
+        except KeyError:
+            colorId = len(self.colors)
+            self.colors.append(color)
+            self._colorIds[color] = colorId
+            return colorId
+
+    def _insert(self, row):
+        """Insert a row at its sorted position."""
+        self._clusterLevels = []
+        self.changeCount += 1
+        self._ends = None
+        self._intervalTree = None
+        timestamp, duration, title, scId, colorId, timeStr = row
+        i = self._find((timestamp, duration, title or '', scId))
+        self.starts.insert(i, timestamp)
+        self.durations.insert(i, duration)
+        self.titles.insert(i, title)
+        self.scIds.insert(i, scId)
+        self.colorIds.insert(i, colorId)
+        self._labels.insert(i, timeStr)
+        if self._maxDuration is not None and duration > self._maxDuration:
+            self._maxDuration = duration
+
+    def _insert_sections(self, newSections, cancelEvent=None):
+        """Add sections to the index.
+
+        newSections is a list of (scId, signature) tuples.
+        Many sections are merged by sorting all rows at once,
+        instead of inserting them one by one.
+        Return early, if cancelEvent is set.
+        """
+        newRows = []
+        for i in range(0, len(newSections), self.CANCEL_CHECK_STEP):
+            if cancelEvent is not None and cancelEvent.is_set():
+                return
+
+            for scId, signature in newSections[i:i + self.CANCEL_CHECK_STEP]:
+                row = self._make_row(scId, signature)
+                if row is not None:
+                    newRows.append(row)
+        if cancelEvent is not None and cancelEvent.is_set():
+            return
+
+        if len(newRows) < self.BULK_UPDATE_MIN:
+            for row in newRows:
+                self._insert(row)
+            return
+
+        rows = list(zip(
+            self.starts,
+            self.durations,
+            self.titles,
+            self.scIds,
+            self.colorIds,
+            self._labels,
+        ))
+        rows.extend(newRows)
+        rows.sort(key=lambda row: (row[0], row[1], row[2] or '', row[3]))
+        self._set_columns(rows)
+
+    def _make_entry(self, signature):
+        """Return a tuple: (timestamp, duration, isSpecific).
+
+        The timestamp is None, if the section is not shown on the timeline.
+        """
+        (
+            scType,
+            scDate,
+            scTime,
+            scDay,
+            lastsDays,
+            lastsHours,
+            lastsMinutes,
+            __,
+            __,
+        ) = signature
+        if scType != 0:
+            return None, None, False
+
+        try:
+            refIso, substituteMissingTime = self._rebuildKey
+            if scTime is None:
+                if not substituteMissingTime:
+                    return None, None, False
+
+                scTime = '00:00'
+
+            if scDate is not None:
+                isSpecific = True
+                timestamp, __ = parse_date_time(scDate, scTime)
+            elif scDay is not None:
+                isSpecific = False
+                if refIso is None:
+                    refIso = '0001-01-01'
+                timestamp, __ = parse_day_time(scDay, scTime, refIso)
+            else:
+                return None, None, False
+
+            duration = get_seconds(lastsDays, lastsHours, lastsMinutes)
+            return timestamp, duration, isSpecific
+
+        except:
+            return None, None, False
+
+    def _make_label(self, i):
+        """Return the date/time label of the i-th section."""
+        signature, __, isSpecific = self._records[self.scIds[i]]
+        __, __, __, day, lastsDays, lastsHours, lastsMinutes, __, __ = (
+            signature
+        )
+        durationStr = get_duration_str(lastsDays, lastsHours, lastsMinutes)
+        days, seconds = divmod(self.starts[i], 86400)
+        hour, minute = divmod(seconds // 60, 60)
+        if isSpecific:
+            weekDay = day_abbr[weekday_from_days(days)]
+            dateStr = self._tlvCtrl.datestr(date(*civil_from_days(days)))
+            return (
+                f"{weekDay} {dateStr} "
+                f"{hour:02}:{minute:02}{durationStr}"
+            )
+
+        if self._rebuildKey[0] is None:
+            weekDay = ''
+        else:
+            weekDay = f'{day_abbr[weekday_from_days(days)]} '
+        return (
+            f"{weekDay}{_('Day')} {day} "
+            f"{hour:02}:{minute:02}{durationStr}"
+        )
+
+    def _make_row(self, scId, signature):
+        """Register the section and return a row tuple for the columns.
+
+        The row is (timestamp, duration, title, scId, colorId, timeStr).
+        Return None, if the section is not shown on the timeline.
+        """
+        timestamp, duration, isSpecific = self._make_entry(signature)
+        if timestamp is None:
+            self._records[scId] = (signature, None, False)
+            return None
+
+        title = signature[7]
+        key = (timestamp, duration, title or '', scId)
+        self._records[scId] = (signature, key, isSpecific)
+        if isSpecific:
+            self._specificCount += 1
+        if signature[8]:
+            colorId = self._get_color_id(signature[8])
+        else:
+            colorId = self.DEFAULT_COLOR_ID
+        return (timestamp, duration, title, scId, colorId, None)
+
+    def _remove(self, scId):
+        __, key, isSpecific = self._records.pop(scId)
+        if key is None:
+            return
+
+        self._clusterLevels = []
+        self.changeCount += 1
+        self._ends = None
+        self._intervalTree = None
+        i = self._find(key)
+        del self.starts[i]
+        del self.durations[i]
+        del self.titles[i]
+        del self.scIds[i]
+        del self.colorIds[i]
+        del self._labels[i]
+        if key[1] == self._maxDuration:
+            self._maxDuration = None
+        if isSpecific:
+            self._specificCount -= 1
+
+    def _remove_sections(self, scIds):
+        """Remove sections from the index.
+        
+        Many sections are removed by rebuilding the columns, 
+        instead of deleting the rows one by one.
+        """
+        if len(scIds) < self.BULK_UPDATE_MIN:
+            for scId in scIds:
+                self._remove(scId)
+            return
+
+        removedIds = set()
+        for scId in scIds:
+            __, key, isSpecific = self._records.pop(scId)
+            if key is None:
+                continue
+
+            removedIds.add(scId)
+            if isSpecific:
+                self._specificCount -= 1
+        rows = [
+            row for row in zip(
+                self.starts,
+                self.durations,
+                self.titles,
+                self.scIds,
+                self.colorIds,
+                self._labels,
+            )
+            if row[3] not in removedIds
+        ]
+        self._set_columns(rows)
+
+    def _set_columns(self, rows):
+        """Replace the columns with the sorted rows.
+
+        The rows are (timestamp, duration, title, scId, colorId, timeStr)
+        tuples.
+        """
+        self.starts = array('q', [row[0] for row in rows])
+        self.durations = array('q', [row[1] for row in rows])
+        self.titles = [row[2] for row in rows]
+        self.scIds = [row[3] for row in rows]
+        self.colorIds = array('L', [row[4] for row in rows])
+        self._labels = [row[5] for row in rows]
+        self._maxDuration = None
+        self._clusterLevels = []
+        self.changeCount += 1
+        self._ends = None
+        self._intervalTree = None
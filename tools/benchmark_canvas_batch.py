@@ -0,0 +1,135 @@
+"""Benchmark the batched canvas commands of nv_tlview.
+
+Compare creating and moving canvas items one call at a time
+with submitting the commands in a single Tcl call.
+
+This requires a display. On a headless machine, run the benchmark
+with a virtual display:
+xvfb-run python benchmark_canvas_batch.py
+
+Usage: benchmark_canvas_batch.py [number of items ...]
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+import os
+import sys
+from time import perf_counter
+import tkinter as tk
+
+sys.path.insert(0, f'{os.path.dirname(os.path.abspath(__file__))}/../src')
+from tlv.tlv_canvas_batch import TlvCanvasBatch
+
+SIZES = (10000,)
+REPEAT = 5
+
+
+def create_batched(canvas, batch, n):
+    """Create n section marks and labels in one call; return the IDs."""
+    items = [None] * (2 * n)
+    for i in range(n):
+        x = i % 1000
+        y = i // 1000 * 35
+        batch.create(
+            items,
+            2 * i,
+            'polygon',
+            x, y - 5, x - 5, y, x, y + 5, x + 5, y,
+            fill='white',
+            tags=(f'sc{i}', 'section'),
+        )
+        batch.create(
+            items,
+            2 * i + 1,
+            'text',
+            x + 10,
+            y,
+            text=f'Section {i}',
+            fill='white',
+            anchor='w',
+        )
+    batch.submit()
+    return items
+
+
+def create_single(canvas, n):
+    """Create n section marks and labels one by one; return the IDs."""
+    items = []
+    for i in range(n):
+        x = i % 1000
+        y = i // 1000 * 35
+        items.append(canvas.create_polygon(
+            x, y - 5, x - 5, y, x, y + 5, x + 5, y,
+            fill='white',
+            tags=(f'sc{i}', 'section'),
+        ))
+        items.append(canvas.create_text(
+            x + 10,
+            y,
+            text=f'Section {i}',
+            fill='white',
+            anchor='w',
+        ))
+    return items
+
+
+def move_batched(canvas, batch, items):
+    for i, item in enumerate(items):
+        batch.coords(item, i % 1000 + 1, i // 1000 * 35)
+    batch.submit()
+
+
+def move_single(canvas, items):
+    for i, item in enumerate(items):
+        canvas.coords(item, i % 1000 + 1, i // 1000 * 35)
+
+
+def measure(action, canvas):
+    """Return the best time of action in milliseconds."""
+    times = []
+    for __ in range(REPEAT):
+        canvas.delete('all')
+        start = perf_counter()
+        action()
+        canvas.update_idletasks()
+        times.append(perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(sizes):
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        sys.exit('No display available. Try "xvfb-run".')
+
+    canvas = tk.Canvas(root, width=1000, height=800)
+    canvas.pack()
+    batch = TlvCanvasBatch(canvas)
+    for n in sizes:
+        singleCreate = measure(lambda: create_single(canvas, n), canvas)
+        batchedCreate = measure(
+            lambda: create_batched(canvas, batch, n),
+            canvas,
+        )
+
+        items = create_single(canvas, n)
+        start = perf_counter()
+        move_single(canvas, items)
+        singleMove = (perf_counter() - start) * 1000
+        start = perf_counter()
+        move_batched(canvas, batch, items)
+        batchedMove = (perf_counter() - start) * 1000
+
+        print(
+            f'{n:>7} sections ({2 * n} items) | '
+            f'create: single {singleCreate:8.1f} ms, '
+            f'batched {batchedCreate:8.1f} ms | '
+            f'coords: single {singleMove:8.1f} ms, '
+            f'batched {batchedMove:8.1f} ms'
+        )
+    root.destroy()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,130 @@
+"""Benchmark the section index of nv_tlview.
+
+Compare the column storage of the section index with
+the former layout: a list of section tuples with preformatted labels,
+a parallel list of timestamps, and a list of sort keys.
+Both layouts are measured along with the section records,
+which hold the signatures and the sort keys.
+
+Usage: benchmark_section_index.py [number of sections ...]
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+import gc
+import os
+import sys
+from time import perf_counter
+import tracemalloc
+
+from fake_novel import Controller
+from fake_novel import make_model
+sys.path.insert(0, f'{os.path.dirname(os.path.abspath(__file__))}/../src')
+from tlv.tlv_globals import prefs
+from tlv.tlv_helper import clear_parse_cache
+from tlv.tlv_section_index import TlvSectionIndex
+
+SIZES = (1000, 10000, 100000)
+
+
+def drop_columns(sectionIndex):
+    """Discard the columns, keeping the section records."""
+    sectionIndex.starts = []
+    sectionIndex.durations = []
+    sectionIndex.titles = []
+    sectionIndex.scIds = []
+    sectionIndex.colorIds = []
+    sectionIndex.colors = []
+    sectionIndex._labels = []
+
+
+def make_tuple_layout(sectionIndex):
+    """Return the section data in the former list-of-tuples layout.
+
+    As before, the sort keys are shared with the section records.
+    """
+    srtSections = [
+        sectionIndex.get_section(i) for i in range(len(sectionIndex))
+    ]
+    starts = [entry[0] for entry in srtSections]
+    keys = [sectionIndex._records[entry[4]][1] for entry in srtSections]
+    return srtSections, starts, keys
+
+
+def measure_memory(build):
+    """Return the number of bytes allocated by build()."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    # a full collection also empties the free lists,
+    # which keep the memory of discarded temporary objects
+    size, __ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run(n):
+    model = make_model(n)
+    controller = Controller()
+
+    # Rebuild time: columns with lazy labels.
+    clear_parse_cache()
+    start = perf_counter()
+    sectionIndex = TlvSectionIndex(model, controller)
+    sectionIndex.update()
+    lazyTime = perf_counter() - start
+
+    # Rebuild time: all labels formatted, as the tuple layout requires.
+    clear_parse_cache()
+    start = perf_counter()
+    eagerIndex = TlvSectionIndex(model, controller)
+    eagerIndex.update()
+    make_tuple_layout(eagerIndex)
+    eagerTime = perf_counter() - start
+
+    # Memory of the sorted section data and the section records,
+    # without the parse cache, which is the same for both layouts.
+    def build_columns():
+        sectionIndex = TlvSectionIndex(model, controller)
+        sectionIndex.update()
+        clear_parse_cache()
+        return sectionIndex
+
+    def build_columns_labeled():
+        sectionIndex = build_columns()
+        for i in range(len(sectionIndex)):
+            sectionIndex.get_time_str(i)
+        return sectionIndex
+
+    def build_tuples():
+        tupleIndex = build_columns()
+        tupleLayout = make_tuple_layout(tupleIndex)
+        # all labels are formatted, as the tuple layout requires
+        drop_columns(tupleIndex)
+        return tupleIndex, tupleLayout
+
+    tupleLayoutSize = measure_memory(build_tuples)
+    columnSize = measure_memory(build_columns)
+    labeledSize = measure_memory(build_columns_labeled)
+
+    print(
+        f'{n:>7} sections | '
+        f'rebuild {lazyTime * 1000:8.1f} ms '
+        f'(eager labels {eagerTime * 1000:8.1f} ms) | '
+        f'{columnSize / n:6.1f} bytes/section '
+        f'(all labels {labeledSize / n:6.1f}, '
+        f'tuples {tupleLayoutSize / n:6.1f} bytes/section)'
+    )
+
+
+def main(sizes):
+    prefs['color_section_mark'] = 'white'
+    for n in sizes:
+        run(n)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,485 @@
+"""Benchmark the nv_tlview timeline with synthetic novels.
+
+Measure the timeline operations for date-based, day-based,
+and mixed projects of different sizes, and report the median (p50)
+and 95th percentile (p95) times, together with the canvas item counts.
+
+With a display, the Tk timeline view is measured.
+On a headless machine, run the suite with a virtual display:
+xvfb-run python benchmark_timeline.py
+With --headless, or if no display is available,
+the section index and the layout engine are measured instead,
+and the item counts are estimated.
+
+The results can be written to a JSON file for comparing releases.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+import argparse
+from configparser import ConfigParser
+from datetime import datetime
+import json
+import os
+import platform
+import sys
+from time import perf_counter
+from time import sleep
+from types import SimpleNamespace
+
+from fake_novel import Controller
+from fake_novel import KINDS
+from fake_novel import make_model
+sys.path.insert(0, f'{os.path.dirname(os.path.abspath(__file__))}/../src')
+from tlv.tlv_globals import DAY
+from tlv.tlv_globals import HOUR
+from tlv.tlv_globals import prefs
+from tlv.tlv_helper import clear_parse_cache
+from tlv.tlv_helper import get_percentile
+from tlv.tlv_layout_engine import TlvLayoutEngine
+from tlv.tlv_section_index import TlvSectionIndex
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 20
+WINDOW_WIDTH = 1200
+WINDOW_HEIGHT = 800
+DRAG_STEP = 40
+# pixels per drag event
+PREFS = dict(
+    color_scale_background='gray25',
+    color_major_scale='white',
+    color_minor_scale='gray60',
+    color_section_background='black',
+    color_section_mark='white',
+    color_section_title='white',
+    color_section_date='gray60',
+    color_indicator='lightblue',
+    color_window_mark='gray40',
+    substitute_missing_time=False,
+    localize_date=False,
+    packed_cascading=False,
+)
+# the viewer's default settings
+
+# Layout constants of the timeline view, for the headless measurement.
+PAD_X = 100
+SCALE_MIN = 10
+SCALE_SPACING_MAX = 480
+SCALE_SPACING_MIN = 120
+MINOR_SPACING_MIN = 40
+OV_SCALE_RATIO = 9
+OV_SPACING_RATIO = 2
+CHAR_WIDTH = 7
+# estimated average character width in pixels
+
+
+class HeadlessTimeline:
+    """Timeline operations performed by the section index and the layout.
+
+    The canvas item counts are estimated:
+    three items per section, two items per scale line,
+    and two items per overview label.
+    """
+
+    def __init__(self, model):
+        self._model = model
+        self._controller = Controller()
+        self._layout = TlvLayoutEngine(lambda text: CHAR_WIDTH * len(text))
+        self._sectionIndex = None
+        self._items = {}
+        self.startTimestamp = 0
+        self.scale = SCALE_MIN
+        self.sort_sections()
+
+    def close(self):
+        pass
+
+    def count_items(self):
+        return dict(self._items)
+
+    def drag(self, deltaX):
+        self.startTimestamp += deltaX * self.scale
+        self._draw()
+
+    def draw_timeline(self):
+        self._draw()
+
+    def fit_window(self):
+        self.refresh()
+        first, last = self._get_time_range()
+        self.scale = max(
+            (last - first) / (WINDOW_WIDTH - 2 * PAD_X),
+            SCALE_MIN,
+        )
+        self.startTimestamp = first - PAD_X * self.scale
+        self._draw()
+
+    def go_to_middle(self):
+        self.scale = (DAY * 2) / (SCALE_SPACING_MAX - SCALE_SPACING_MIN)
+        starts = self._sectionIndex.starts
+        self.startTimestamp = (
+            starts[len(starts) // 2] - WINDOW_WIDTH / 2 * self.scale
+        )
+        self._draw()
+
+    def page(self, forward):
+        deltaX = WINDOW_WIDTH * 0.9 * self.scale
+        if forward:
+            self.startTimestamp += deltaX
+        else:
+            self.startTimestamp -= deltaX
+        self._draw()
+
+    def refresh(self):
+        self._sectionIndex.update()
+
+    def sort_sections(self):
+        clear_parse_cache()
+        self._sectionIndex = TlvSectionIndex(self._model, self._controller)
+        self._sectionIndex.update()
+
+    def zoom(self, zoomIn):
+        if zoomIn:
+            self.scale = max(self.scale / 2, SCALE_MIN)
+        else:
+            self.scale *= 2
+        self._draw()
+
+    def _draw(self):
+        records, __ = self._layout.arrange_sections(
+            self._sectionIndex,
+            self.startTimestamp,
+            self.scale,
+            0,
+            WINDOW_WIDTH,
+            packed=prefs['packed_cascading'],
+        )
+        scaleLines = 0
+        majorResolution, __, units = self._layout.get_resolution(
+            self.scale,
+            HOUR,
+            SCALE_SPACING_MIN,
+        )
+        minorResolution, __, __ = self._layout.get_minor_resolution(
+            majorResolution,
+            units,
+            self.scale,
+            MINOR_SPACING_MIN,
+        )
+        endTimestamp = self.startTimestamp + WINDOW_WIDTH * self.scale
+        for resolution in (majorResolution, minorResolution):
+            if resolution is None:
+                continue
+
+            scaleLines += self._count_lines(
+                resolution,
+                self.startTimestamp,
+                endTimestamp,
+                self.scale,
+            )
+        ovScale = self.scale * OV_SCALE_RATIO
+        ovStart = self.startTimestamp - (
+            WINDOW_WIDTH / OV_SCALE_RATIO * (OV_SCALE_RATIO // 2) * ovScale
+        )
+        ovResolution, __, __ = self._layout.get_resolution(
+            ovScale,
+            HOUR,
+            SCALE_SPACING_MIN * OV_SPACING_RATIO,
+        )
+        ovLabels = self._count_lines(
+            ovResolution,
+            ovStart,
+            ovStart + WINDOW_WIDTH * ovScale,
+            ovScale,
+        )
+        self._items = {
+            'sections': len(records) * 3,
+            'scale': scaleLines * 2,
+            'overview': ovLabels * 2 + 2,
+        }
+
+    def _count_lines(self, resolution, tsFrom, tsTo, scale):
+        count = 0
+        for __ in self._layout.get_scale_lines(
+            resolution,
+            tsFrom,
+            tsTo,
+            tsFrom,
+            scale,
+        ):
+            count += 1
+        return count
+
+    def _get_time_range(self):
+        sectionIndex = self._sectionIndex
+        return (
+            sectionIndex.starts[0],
+            sectionIndex.starts[-1] + sectionIndex.durations[-1],
+        )
+
+
+class TkTimeline:
+    """Timeline operations performed by the Tk timeline view.
+
+    Each operation includes the pending redraw and the idle tasks.
+    """
+
+    def __init__(self, model, root):
+        from tlv.tlv_controller import TlvController
+
+        self._model = model
+        self._root = root
+        self._controller = TlvController(model, root)
+        self._view = self._controller.view
+        while self._controller.isLoading:
+            # Large projects are indexed in the background.
+            root.update()
+            sleep(0.01)
+        root.update()
+
+    def close(self):
+        self._controller.on_quit()
+        self._root.update()
+
+    def count_items(self):
+        tlFrame = self._view.tlFrame
+        return {
+            'sections': len(tlFrame._sectionCanvas.find_all()),
+            'scale': len(tlFrame._scaleCanvas.find_all()),
+            'overview': len(tlFrame._ovCanvas.find_all()),
+        }
+
+    def drag(self, deltaX):
+        view = self._view
+        view._xPos = WINDOW_WIDTH // 2
+        view._yPos = 0
+        view._on_drag(SimpleNamespace(x=view._xPos - deltaX, y=0))
+        self._root.update_idletasks()
+
+    def draw_timeline(self):
+        self._view.draw_timeline()
+        self._root.update_idletasks()
+
+    def fit_window(self):
+        self._view.fit_window()
+        self._finish()
+
+    def go_to_middle(self):
+        view = self._view
+        view.set_day_scale()
+        starts = self._controller.sectionIndex.starts
+        view.startTimestamp = (
+            starts[len(starts) // 2] - WINDOW_WIDTH / 2 * view.scale
+        )
+        self._finish()
+
+    def page(self, forward):
+        if forward:
+            self._view.page_forward()
+        else:
+            self._view.page_back()
+        self._finish()
+
+    def refresh(self):
+        self._view.sort_sections()
+        self._root.update_idletasks()
+
+    def sort_sections(self):
+        clear_parse_cache()
+        self._controller.sectionIndex = TlvSectionIndex(
+            self._model,
+            self._controller,
+        )
+        self._view.sort_sections()
+        self._root.update_idletasks()
+
+    def zoom(self, zoomIn):
+        if zoomIn:
+            self._view.increase_scale()
+        else:
+            self._view.reduce_scale()
+        self._finish()
+
+    def _finish(self):
+        self._view.flush_redraw()
+        self._root.update_idletasks()
+
+
+def get_version():
+    config = ConfigParser()
+    config.read(f'{os.path.dirname(os.path.abspath(__file__))}/../VERSION')
+    return config.get('LATEST', 'version', fallback='unknown')
+
+
+def measure(timeline, operation, action, repeat):
+    """Return a result dictionary for an operation performed repeat times.
+
+    action is called with the run number as argument.
+    """
+    times = []
+    for i in range(repeat):
+        start = perf_counter()
+        action(i)
+        times.append(perf_counter() - start)
+    times.sort()
+    return {
+        'operation': operation,
+        'runs': repeat,
+        'p50_ms': round(get_percentile(times, 50) * 1000, 3),
+        'p95_ms': round(get_percentile(times, 95) * 1000, 3),
+        'items': timeline.count_items(),
+    }
+
+
+def open_display(headless):
+    """Return the Tk root window, or None, if running headless."""
+    if headless:
+        return None
+
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        print('No display available: measuring headless.')
+        return None
+
+    root.geometry(f'{WINDOW_WIDTH}x{WINDOW_HEIGHT}')
+    return root
+
+
+def run_project(timeline, repeat):
+    """Return a list of result dictionaries for a timeline."""
+    results = []
+    results.append(measure(
+        timeline,
+        'sort_sections',
+        lambda i: timeline.sort_sections(),
+        repeat,
+    ))
+    results.append(measure(
+        timeline,
+        'refresh',
+        lambda i: timeline.refresh(),
+        repeat,
+    ))
+    results.append(measure(
+        timeline,
+        'fit_window',
+        lambda i: timeline.fit_window(),
+        repeat,
+    ))
+    results.append(measure(
+        timeline,
+        'draw_timeline',
+        lambda i: timeline.draw_timeline(),
+        repeat,
+    ))
+
+    # Navigate around the middle of the story at day scale.
+    timeline.go_to_middle()
+    results.append(measure(
+        timeline,
+        'zoom',
+        lambda i: timeline.zoom(i % 2 == 0),
+        repeat,
+    ))
+    results.append(measure(
+        timeline,
+        'page',
+        lambda i: timeline.page(i % 2 == 0),
+        repeat,
+    ))
+    results.append(measure(
+        timeline,
+        'drag_pan',
+        lambda i: timeline.drag(DRAG_STEP if i % 20 < 10 else -DRAG_STEP),
+        repeat,
+    ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the nv_tlview timeline.',
+    )
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='measure the layout without a display',
+    )
+    parser.add_argument(
+        '--sizes',
+        nargs='+',
+        type=int,
+        default=SIZES,
+        help='numbers of sections',
+    )
+    parser.add_argument(
+        '--kinds',
+        nargs='+',
+        choices=KINDS,
+        default=KINDS,
+        help='kinds of projects',
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=REPEAT,
+        help='runs per operation',
+    )
+    parser.add_argument(
+        '--output',
+        help='JSON file for the results',
+    )
+    args = parser.parse_args()
+
+    prefs.update(PREFS)
+    root = open_display(args.headless)
+    if root is None:
+        mode = 'headless'
+    else:
+        mode = 'tk'
+    results = []
+    for kind in args.kinds:
+        for n in args.sizes:
+            model = make_model(n, kind)
+            if root is None:
+                timeline = HeadlessTimeline(model)
+            else:
+                timeline = TkTimeline(model, root)
+            for result in run_project(timeline, args.repeat):
+                result['kind'] = kind
+                result['sections'] = n
+                results.append(result)
+                items = ' '.join(
+                    f'{key}={value}' for key, value in result['items'].items()
+                )
+                print(
+                    f'{kind:>5} {n:>7} {result["operation"]:<14}'
+                    f'p50 {result["p50_ms"]:9.2f} ms  '
+                    f'p95 {result["p95_ms"]:9.2f} ms  '
+                    f'items: {items}'
+                )
+            timeline.close()
+    if root is not None:
+        root.destroy()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'version': get_version(),
+                    'date': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'mode': mode,
+                    'results': results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
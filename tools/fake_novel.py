@@ -0,0 +1,79 @@
+"""Provide a synthetic novel for the nv_tlview benchmarks.
+
+The model exposes the attributes that the timeline viewer reads:
+sections, referenceDate, and the timeline-relevant section fields.
+
+Copyright (c) Peter Triesberger
+For further information see https://github.com/peter88213/nv_tlview
+License: GNU GPLv3 (https://www.gnu.org/licenses/gpl-3.0.en.html)
+"""
+from datetime import date
+import random
+
+KINDS = ('date', 'day', 'mixed')
+# date: all sections have a date
+# day: all sections have a day relative to the reference date
+# mixed: half of the sections have a date, the others have a day
+REFERENCE_DATE = '2020-01-01'
+
+
+class Section:
+
+    def __init__(self):
+        self.scType = 0
+        self.date = None
+        self.time = None
+        self.day = None
+        self.lastsDays = None
+        self.lastsHours = None
+        self.lastsMinutes = None
+        self.title = None
+        self.color = None
+
+
+class Model:
+
+    def __init__(self):
+        self.sections = {}
+        self.referenceDate = REFERENCE_DATE
+
+
+class Controller:
+    """Stand-in for the timeline controller of the section index."""
+
+    def datestr(self, dt):
+        return dt.isoformat().split('T')[0]
+
+
+def make_model(n, kind='mixed', seed=1):
+    """Return a model with n sections.
+
+    The story runs forward in time with random gaps,
+    interrupted by occasional flashbacks.
+    """
+    rnd = random.Random(seed)
+    model = Model()
+    refDays = date.fromisoformat(REFERENCE_DATE).toordinal()
+    minutes = 0
+    # story time in minutes since the reference date
+    for i in range(n):
+        if rnd.random() < 0.1:
+            sectionMinutes = minutes - rnd.randint(1, 365) * 1440
+        else:
+            minutes += rnd.choice((30, 120, 600, 1440, 4320))
+            sectionMinutes = minutes
+        dayOffset, minuteOfDay = divmod(sectionMinutes, 1440)
+        section = Section()
+        section.time = f'{minuteOfDay // 60:02}:{minuteOfDay % 60:02}:00'
+        if kind == 'date' or (kind == 'mixed' and rnd.random() < 0.5):
+            section.date = date.fromordinal(refDays + dayOffset).isoformat()
+        else:
+            section.day = str(dayOffset)
+        if rnd.random() < 0.3:
+            section.lastsHours = str(rnd.randint(1, 12))
+        if rnd.random() < 0.05:
+            section.lastsDays = str(rnd.randint(1, 5))
+        section.title = f'Section {i + 1}'
+        section.color = rnd.choice((None, None, 'red', 'green', 'blue'))
+        model.sections[f'sc{i + 1}'] = section
+    return model